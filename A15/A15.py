@@ -27,7 +27,13 @@ Usage:
 
 Tools:
     figure               : Create images of generated structures.
-    interactive          : Interact with generated structures.
+    interactive          : Interact with generated structures, drawn nearest-first with live n/rescale/scale controls.
+    stats                : Summarize generated structures without rendering.
+    sweep                : Tabulate numeric stability across many scales from one generated lattice.
+    batch                : Render many configuration files (or directories) across worker processes.
+    serve                : Keep the stack warm and render requests from a local UNIX socket ($A15_SERVE) across workers.
+    stream               : Encode point files (.npy or raw float64) to packed A15 IDs, or decode them, in chunks, never overwriting.
+    export               : Write generated cells as an indexed mesh (binary PLY or NumPy NPZ), chunk by chunk.
 
 Params:
     <path>               : Read configuration from file.
@@ -36,13 +42,22 @@ Params:
 
 Tool Options:
     -auto=<bool|name>    : Set or enable auto-configuration groups.
+    -backend=<name>      : Render views with "mplot3d" or the NumPy "raster" z-buffer (figure). (default: "mplot3d")
+    -cache=<bool|int>    : Reuse figure/stats/sweep output from $A15_CACHE (~/.cache/A15), bounded in MiB (true: 256). (default: off)
+    -chunk=<int>         : Bound memory: points (stream), cells (export), floats (sweep), or cells per interactive batch.
+    -format=<name>       : Set output format ("json"/"text" for stats/sweep, "ply"/"npz" for export, image format for figure).
+    -mesh=<bool>         : Merge cells into one indexed mesh, drawing shared faces, edges, and vertices once (figure).
     -pop=<bool|exec>     : Open visualization in a new pop-up window.
+    -profile=<bool|json> : Print per-stage wall time, calls, peak memory, and counts to stderr (table or "json").
+    -varint=<bool>       : Store stream output as delta-encoded varints instead of fixed 8-byte IDs.
+    -workers=<bool|int>  : Number of worker processes for batch, serve, stream, or multi-view figure panels. (default: CPU count|off)
 
 Param Options:
     -auto=<bool|name>    : (all) Set or enable auto-configuration group.
     -h=<int|ratio>       : (pyritohedra) Adjust height. (default: "1/2")
     -planes=<str>        : (tetradecahedra) Configure planes. (default: "XYZ")
     -prescale=<ratio|int>: (all) Adjust implicit scale. (default: 20|24)
+    -shell=<int|ratio>   : (all) Only generate the outer shell of this thickness (in units of n).
 
 Display Options:
     -axes=<bool>         : Toggle visualization axes.
@@ -52,6 +67,7 @@ Display Options:
     -edges=<bool>        : Show or hide shape edges.
     -faces=<bool>        : Show or hide shape faces.
     -lines=<bool>        : Show or hide shape lines.
+    -opaque=<bool>       : Draw faces opaque, skipping cells enclosed by other opaque cells.
     -stix=<bool>         : Show Tetrastix or Weaire-Phelan.
     -title=<bool|str>    : Show or set visualization title.
     -verts=<bool>        : Show or hide shape vertices.
@@ -61,6 +77,7 @@ Scaling Options:
     -n=<int|ratio>       : Adjust the detail level of visualization.
     -rescale=<int|ratio> : Adjust the visualization scale after other operations.
     -scale=<int|ratio>   : Directly scale the visualization.
+    -scales=<int|range>  : Sweep numerators 1..n (or lo,hi[,den]) over a denominator (sweep). (default: 1,4096,96)
 
 Advanced Options:
     -colormap=<name>     : Set colormap for shapes or the visualization. (default: "CMRmap")
@@ -77,6 +94,12 @@ Examples:
     - Shape with Properties: python3 A15.py -pop,auto,edges figure -scale=0 pyritohedra -h=G06
     - Multiple Configurations: python3 A15.py -pop fig:n=10/3:edges:faces:centers:stix p++ t+:lines
     - Configuration from files: python3 A15.py - ./fig-intro.png.txt <<< :pop:title:axes:bars:views=4
+    - Render many figures at once: python3 A15.py batch:workers=4:savefig=_build/draft/ ./
+    - Serve warm renders: python3 A15.py serve:workers=4 /tmp/A15.sock & A15_SERVE=/tmp/A15.sock make build
+    - Stream a capture to IDs: python3 A15.py stream:scale=1/96:workers=4:savefig=_build/ids/ capture.npy
+    - Headless summary as JSON: python3 A15.py stats:format=json:scale=1/96:n=40/9 pyritohedra tetradecahedra
+    - Sweep 4096 scales at once: python3 A15.py sweep:scales=1,4096,96:n=40/9 pyritohedra tetradecahedra
+    - Export an indexed mesh: python3 A15.py export:scale=1/96:n=40/9:savefig=honeycomb.ply pyritohedra tetradecahedra
 
 Notes:
     - For deeper understanding or intricate setups, refer to the main paper or supplementary content.
@@ -91,8 +114,7 @@ Further Exploration:
 import sys, os, traceback
 from pprint import pprint as print
 
-import collections, functools, itertools, operator, string, numbers, random, math
-import numpy, matplotlib.pyplot, matplotlib.ticker, mpl_toolkits.mplot3d, scipy.spatial
+import collections, itertools, operator, string, numbers, random, math, fractions, json, contextlib, functools, time
 
 
 R = dict()
@@ -109,9 +131,9 @@ V["XZ"] = ((0, -90),)
 V["XY"] = ((90, -90),)
 V["YZ"] = ((0, -180),)
 V[120] = ((30, -210),)
-V["G"] = ((numpy.degrees(R["G06"]), -90),)
-V["G45"] = ((numpy.degrees(R["G06"]), -45),)
-V["G90"] = ((numpy.degrees(R["G06"]), -180),)
+V["G"] = ((math.degrees(R["G06"]), -90),)
+V["G45"] = ((math.degrees(R["G06"]), -45),)
+V["G90"] = ((math.degrees(R["G06"]), -180),)
 V[345] = V["XY"] + V["XZ"] + V["G45"]
 V[9] = V["XY"] + V["XZ"] + V["YZ"] + V["G"] + V["G45"] + V["G90"] + V["M"] + V["K"] + V[120]
 V[4] = V["XY"] + V["XZ"] + V["G45"] + V["YZ"]
@@ -119,8 +141,14 @@ V[3] = V["XY"] + V["XZ"] + V["YZ"]
 V[2] = V["XY"] + V["XZ"]
 V[1] = V["G45"]
 
+A = ((0, 0, 0), (2, 2, 2), (3, 2, 0), (1, 2, 0), (0, 3, 2), (0, 1, 2), (2, 0, 3), (2, 0, 1))
+H = [("magic", "S4"), ("version", "u1"), ("stix", "u1"), ("varint", "u1"), ("order", "u1"),
+     ("count", "<u8"), ("scale", "<i8", (2,)), ("epsilon", "<f8"), ("padding", "V24")]
+K = tuple(A.index(xyz) if xyz in A else -1 for xyz in itertools.product(range(4), repeat=3))
+
 
 def tetradecahedra(planes="XYZ", prescale=None, stix=False, at=lambda xyz: True, o=(0, 0, 0), **kwds):
+    import numpy
     prescale = prescale if prescale is not None else 24 if stix else 20
     o1 = numpy.array((
         (  2,  0, -1),
@@ -128,8 +156,8 @@ def tetradecahedra(planes="XYZ", prescale=None, stix=False, at=lambda xyz: True,
         (  0, -1,  2),
     ))
     o2 = numpy.roll(o1.T, 1, axis=1)
-    at1 = lambda xyz, at=at: at(xyz) and (xyz[0]%4, xyz[1]%4, xyz[2]%4) == (0, 0, 0)
-    at2 = lambda xyz, at=at: at(xyz) and (xyz[0]%4, xyz[1]%4, xyz[2]%4) == (2, 2, 2)
+    at1 = lambda xyz, at=at: at(xyz) & (xyz % 4 == 0).all(axis=-1)
+    at2 = lambda xyz, at=at: at(xyz) & (xyz % 4 == 2).all(axis=-1)
     px = pyritohedron(h=0, prescale=prescale, cube=True) if stix else numpy.array((
         ( -6,  33,  -0), (  4,  28,  20), (  4,  28, -20), (-24,  24,  -0), ( -4,  20,  28), ( -4,  20, -28),
         ( 24,  18,  15), ( 24,  18, -15), (-24,  15,  18), (-24,  15, -18), (  6,  -0,  33), ( 24,  -0,  24),
@@ -138,28 +166,31 @@ def tetradecahedra(planes="XYZ", prescale=None, stix=False, at=lambda xyz: True,
     ))*prescale/20
     py, pz = numpy.roll(px, 1, axis=1), numpy.roll(px, 2, axis=1)
     planes = planes.replace("X", "xxx").replace("Y", "yyy").replace("Z", "zzz")
-    planes.count("x")&1 and (yield from lattice(o=o1[1], fn=lambda xyz:  px, at=at1, **kwds))
-    planes.count("x")&2 and (yield from lattice(o=o2[1], fn=lambda xyz: -px, at=at2, **kwds))
-    planes.count("y")&1 and (yield from lattice(o=o1[2], fn=lambda xyz:  py, at=at1, **kwds))
-    planes.count("y")&2 and (yield from lattice(o=o2[2], fn=lambda xyz: -py, at=at2, **kwds))
-    planes.count("z")&1 and (yield from lattice(o=o1[0], fn=lambda xyz:  pz, at=at1, **kwds))
-    planes.count("z")&2 and (yield from lattice(o=o2[0], fn=lambda xyz: -pz, at=at2, **kwds))
-    if kwds.get("centers") or kwds.get("lines"):
-        yield from lattice(fn=lambda xyz: o1*24, at=at1, **kwds)
-        yield from lattice(fn=lambda xyz: o2*24, at=at2, **kwds)
+    return itertools.chain(*filter(None, (
+        planes.count("x")&1 and lattice(o=o1[1], fn=lambda xyz:  px, at=at1, **kwds),
+        planes.count("x")&2 and lattice(o=o2[1], fn=lambda xyz: -px, at=at2, **kwds),
+        planes.count("y")&1 and lattice(o=o1[2], fn=lambda xyz:  py, at=at1, **kwds),
+        planes.count("y")&2 and lattice(o=o2[2], fn=lambda xyz: -py, at=at2, **kwds),
+        planes.count("z")&1 and lattice(o=o1[0], fn=lambda xyz:  pz, at=at1, **kwds),
+        planes.count("z")&2 and lattice(o=o2[0], fn=lambda xyz: -pz, at=at2, **kwds),
+        (kwds.get("centers") or kwds.get("lines")) and lattice(fn=lambda xyz: o1*24, at=at1, **kwds),
+        (kwds.get("centers") or kwds.get("lines")) and lattice(fn=lambda xyz: o2*24, at=at2, **kwds),
+    )))
 
 
 def pyritohedra(h=None, prescale=None, stix=None, cube=None, at=lambda xyz: True, **kwds):
+    import numpy
     cube = cube if cube is not None else stix
     h = h if h is not None else 0 if stix else 1/2
     r = numpy.array(((1, 0, 0), (0, 0, -1), (0, 1, 0)))
     p = pyritohedron(h=h, prescale=prescale, cube=cube, center=kwds.get("centers"))
-    fn = lambda xyz: p if xyz[0] % 4 == 0 else numpy.dot(p, r.T)
-    at = lambda xyz, at=at: at(xyz) and (xyz[0]%4, xyz[1]%4, xyz[2]%4) in ((0, 0, 0), (2, 2, 2))
+    fn = lambda xyz: numpy.where((xyz[:, 0] % 4 == 0)[:, None, None], p, numpy.dot(p, r.T))
+    at = lambda xyz, at=at: at(xyz) & ((xyz % 4 == 0).all(axis=-1) | (xyz % 4 == 2).all(axis=-1))
     return lattice(fn=fn, at=at, **kwds)
 
 
 def pyritohedron(h, prescale=None, cube=None, center=None):
+    import numpy
     prescale = prescale if prescale is not None else 20 if h else 24
     h = R[h] if h in R else operator.truediv(*h) if isinstance(h, tuple) else h
     p = numpy.unique(numpy.vstack(tuple(itertools.chain(
@@ -174,33 +205,547 @@ def pyritohedron(h, prescale=None, cube=None, center=None):
     return p
 
 
-def lattice(n=0, o=(0, 0, 0), at=lambda xyz: True, fn=lambda xyz: [(0, 0, 0)], **kwds):
-    n, gen = -1, n
-    if isinstance(gen, tuple):
-        gen = operator.truediv(*gen) if len(gen)==2 else (gen,) if len(gen)==3 else numpy.reshape(gen, (len(gen)//3, 3))
-    if isinstance(gen, numbers.Real):
-        n = math.ceil(gen*2)
-        if not isinstance(gen, numbers.Integral):
-            r, at = gen*2, lambda xyz, at=at: at(xyz) and scipy.spatial.distance.pdist([(0, 0, 0), xyz]) <= r
-        gen = itertools.product(range(-n, n+1), repeat=3)
-    for xyz in filter(at, gen):
-        xyz = numpy.array(xyz)
-        p = numpy.array(fn(xyz))
-        yield p + ((xyz + o) * 24), configuration(**kwds)
+def lattice(n=0, o=(0, 0, 0), at=lambda xyz: True, fn=lambda xyz: [(0, 0, 0)], batch=False, shell=None, band=None,
+            **kwds):
+    import numpy
+    config = configuration(**kwds)
+    if not batch:
+        return ((cell, config) for cell in cells(n=n, o=o, at=at, fn=fn, shell=shell))
+    with timed("lattice"):
+        w = float(numpy.abs(o).max(initial=0))
+        xyz = sites(n=n, at=at, shell=shell, band=None if band is None else (math.floor(2*band[0] - w), 2*band[1] + w))
+        if band is not None:
+            reach = numpy.abs(xyz + o).max(axis=-1, initial=0) / 2
+            xyz = xyz[(reach > band[0]) & (reach <= band[1])]
+        p = numpy.asarray(fn(xyz))
+        prototypes, index = [p] if p.ndim == 2 else list(), numpy.zeros(len(xyz), dtype=numpy.int32)
+        rest = numpy.arange(len(xyz) if p.ndim == 3 else 0)
+        while len(rest) and len(prototypes) < 8:
+            hit = (p[rest] == p[rest[0]]).all(axis=(1, 2))
+            index[rest[hit]] = len(prototypes)
+            prototypes.append(p[rest[0]].copy())
+            rest = rest[~hit]
+        if len(rest):
+            more, inverse = numpy.unique(p[rest], axis=0, return_inverse=True)
+            index[rest] = len(prototypes) + numpy.reshape(inverse, -1)
+            prototypes.extend(more)
+        tally("lattice", cells=len(xyz), prototypes=len(prototypes))
+    block = shaped(
+        prototypes=(*prototypes,),
+        translations=((xyz + o) * 24).astype(numpy.int32),
+        index=index,
+        config=numpy.zeros(len(xyz), dtype=numpy.int32),
+        configs=(config,),
+    )
+    return iter(((block, config),) if len(xyz) else ())
+
 
+def gather(*blocks):
+    import numpy
+    prototypes, translations, index, config, configs = list(), list(), list(), list(), dict()
+    for b in blocks:
+        index.append(b.index + len(prototypes))
+        prototypes.extend(b.prototypes)
+        translations.append(b.translations)
+        config.append(numpy.array([configs.setdefault((c._fields, c), len(configs)) for c in b.configs])[b.config])
+    return shaped(
+        prototypes=(*prototypes,),
+        translations=numpy.concatenate((*translations, numpy.empty((0, 3), dtype=numpy.int32))),
+        index=numpy.concatenate((*index, numpy.empty(0, dtype=numpy.int32))),
+        config=numpy.concatenate((*config, numpy.empty(0, dtype=numpy.int32))),
+        configs=(*(c for _, c in configs),),
+    )
 
-def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]=V[1], scale:tuple[int]=(1, 96),
-           title:bool|str=False, bars:bool=False, axes:bool=False, bg:bool=False):
+
+def expand(shape, *shapes):
+    if not isinstance(shape, shaped):
+        yield shape
+        yield from shapes
+        return
+    for t, i, k in zip(shape.translations, shape.index.tolist(), shape.config.tolist()):
+        yield shape.prototypes[i] + t, shape.configs[k]
+
+shaped = collections.namedtuple("shaped", "prototypes translations index config configs")
+
+
+def canonical(shape:str, blocks, configs:dict):
+    for block, config in blocks:
+        k = shape, config._fields, config
+        c = configs[k] = configs[k] if k in configs else configuration(**dict(
+            dict.fromkeys(("colormap", "edges", "faces", "verts", "centers", "lines", "opaque")), **config._asdict()))
+        tally(shape, cells=len(block.index))
+        yield block._replace(configs=(c,))
+
+
+def layers(calls:list, configs:dict):
+    edges = [-1, *range(math.ceil(max((reach for *_, reach in calls), default=0))), math.inf]
+    for lo, hi in zip(edges, edges[1:]):
+        blocks = [block for shape, call, _ in calls for block in canonical(shape, call(band=(lo, hi)), configs)]
+        if blocks:
+            yield hi, gather(*blocks)
+
+layered = collections.namedtuple("layered", "reach bands")
+
+
+def radius(n=0):
+    import numpy
+    n = operator.truediv(*n) if isinstance(n, tuple) and len(n) == 2 else n
+    return n if isinstance(n, numbers.Real) else float(numpy.abs(n).max(initial=0)) / 2
+
+
+def cells(n=0, o=(0, 0, 0), at=lambda xyz: True, fn=lambda xyz: [(0, 0, 0)], shell=None):
+    import numpy
+    xyz = sites(n=n, at=at, shell=shell)
+    p = numpy.asarray(fn(xyz))
+    return (p if p.ndim == 3 else p[None]) + ((xyz + o) * 24)[:, None]
+
+
+def sites(n=0, at=lambda xyz: True, shell=None, band=None):
+    import numpy
+    if isinstance(n, tuple):
+        n = operator.truediv(*n) if len(n)==2 else (n,) if len(n)==3 else numpy.reshape(n, (len(n)//3, 3))
+    shell = operator.truediv(*shell) if isinstance(shell, tuple) else shell
+    if isinstance(n, numbers.Real):
+        r, m, t = n*2, math.ceil(n*2), math.inf if shell is None else shell*2
+        c = m if band is None else int(min(m, band[1]))
+        xy = numpy.indices((max(0, 2*c+1),)*2).reshape(2, -1).T - c
+        if isinstance(n, numbers.Integral):
+            zo = numpy.full(len(xy), m)
+            zi = numpy.where((numpy.abs(xy) <= m - t).all(axis=-1), m - t, -1) if t <= m else numpy.full(len(xy), -1)
+        else:
+            zo, zi = extent(xy, r), extent(xy, r - t)
+        if band is not None:
+            zo = numpy.minimum(zo, band[1]).astype(numpy.int64)
+            zi = numpy.maximum(zi, numpy.where(numpy.abs(xy).max(axis=-1, initial=0) <= band[0], band[0], -1))
+        zi = numpy.minimum(zi, zo).astype(numpy.int64)
+        starts = numpy.column_stack((-zo, zi + 1)).ravel()
+        sizes = numpy.column_stack((numpy.where(zi < 0, 2*zo + 1, zo - zi), numpy.where(zi < 0, 0, zo - zi))).ravel()
+        sizes = numpy.maximum(sizes, 0)
+        z = numpy.arange(sizes.sum()) + numpy.repeat(starts - numpy.cumsum(sizes) + sizes, sizes)
+        n = numpy.column_stack((numpy.repeat(numpy.repeat(xy, 2, axis=0), sizes, axis=0), z))
+    xyz = numpy.reshape(n, (-1, 3))
+    return xyz[numpy.broadcast_to(at(xyz), len(xyz))]
+
+
+def extent(xy, r):
+    import numpy
+    rr = (xy**2).sum(axis=-1)
+    z = numpy.floor(numpy.sqrt(numpy.maximum(r*r - rr, 0))).astype(numpy.int64) if r >= 0 else numpy.full(len(xy), -1)
+    z += numpy.sqrt(rr + (z + 1)**2) <= r
+    z -= numpy.sqrt(rr + z**2) > r
+    return numpy.where(numpy.sqrt(rr + numpy.maximum(z, 0)**2) <= r, z, -1)
+
+
+def boundary(shape, simplices):
+    import numpy
+    tri = shape[simplices]
+    norm = numpy.cross(tri[:, 1] - tri[:, 2], tri[:, 0] - tri[:, 1])
+    norm = (norm / numpy.linalg.norm(norm, axis=-1, keepdims=True)).round(4) + 0.0
+    norm *= numpy.where(norm[numpy.arange(len(norm)), (norm != 0).argmax(axis=-1)] < 0, -1, 1)[:, None]
+    pairs = numpy.sort(simplices[:, [[0, 1], [0, 2], [1, 2]]], axis=-1).reshape(-1, 2)
+    _, index, counts = numpy.unique(
+        numpy.column_stack((numpy.repeat(norm, 3, axis=0), pairs)), axis=0, return_index=True, return_counts=True,
+    )
+    edges = pairs[numpy.sort(index[counts == 1])]
+    dists = numpy.unique((((shape[edges[:, 0]] - shape[edges[:, 1]])**2).sum(axis=-1)**0.5).round(4))
+    return edges, dists
+
+
+def binary(a):
+    import numpy
+    a = numpy.unique(numpy.abs(numpy.asarray(a, dtype=numpy.float64).ravel()))
+    m, e = numpy.frexp(a)
+    num = numpy.ldexp(m, 53).astype(numpy.int64)
+    tz = numpy.frexp(num & -num)[1] - 1
+    power = numpy.where(num == 0, 0, 53 - e - tz)
+    ints = a[power <= 0]
+    base = {0: ints.astype(numpy.int64) if not len(ints) or ints[-1] < 2**63 else numpy.array([*map(int, ints)])}
+    for p in numpy.unique(power[power > 0]).tolist():
+        base[p] = num[power == p] >> tz[power == p]
+    return {p: ns for p, ns in base.items() if len(ns)}
+
+
+def stability(coords, scale=(1, 1), idents=None):
+    import numpy
+    base1 = idents if isinstance(idents, dict) else binary(coords if idents is None else idents)
+    base2 = coords if isinstance(coords, dict) else binary(coords)
+    if len(base2) != 1 and 0 in base2 and len(base2[0]) == 1 and base2[0][0] == 0:
+        origin = base2.pop(0)
+        base2[min(base2)] = numpy.concatenate((base2[min(base2)], origin))
+    base1max, base2max = max((0, *base1)), max((0, *base2))
+    base2rat = operator.truediv(*scale).as_integer_ratio()
+    base2min = max(int(math.log2(base2rat[1])), base1max)
+    base2len = sum(map(len, base2.values()))
+    base2gcd = 1 if base2len == 1 else math.gcd(*(
+        int(numpy.gcd.reduce(ns) if ns.dtype != object else math.gcd(*ns)) << (base2max-b) for b, ns in base2.items()
+    ))
+    base2mm0 = base2rat[0] - base2gcd*2**(base2min-base2max)
+    return epsilon(base1, base2, base1max, base2max, base2rat, base2min, base2gcd, base2mm0)
+
+epsilon = collections.namedtuple("epsilon", "base1 base2 base1max base2max base2rat base2min base2gcd base2mm0")
+
+
+def rational(shape, *shapes, scale:tuple[int]=(1, 96)):
+    import numpy
+    scale = tuple(map(int, scale))
+    if not isinstance(shape, shaped) or scale[1] & (scale[1] - 1):
+        return None
+    if not all((numpy.mod(p, 1) == 0).all() for p in shape.prototypes):
+        return None
+    reach = max((int(numpy.abs(p).max(initial=0)) for p in shape.prototypes), default=0)
+    reach += int(numpy.abs(shape.translations).max(initial=0))
+    idents, coords = [numpy.zeros(0, dtype=numpy.int64)], [numpy.zeros(0, dtype=numpy.int64)]
+    for i, k in numpy.unique(numpy.column_stack((shape.index, shape.config)), axis=0).tolist():
+        c = shape.configs[k]
+        p, t = shape.prototypes[i].astype(numpy.int64), shape.translations[(shape.index == i) & (shape.config == k)]
+        ident = numpy.concatenate([numpy.add.outer(numpy.unique(t[:, d]), numpy.unique(p[:, d])).ravel() for d in range(3)])
+        idents.append(numpy.unique(numpy.abs(ident)))
+        if c.rescale[1] == 1 and float(c.rescale[0]).is_integer():
+            factor = int(c.rescale[0]) * scale[0]
+            if reach * abs(factor) >= 2**63:
+                return None
+            coords.append(numpy.unique(numpy.abs(ident * factor)))
+    m, k = numpy.unique(numpy.concatenate(coords)), scale[1].bit_length() - 1
+    power = numpy.where(m == 0, 0, k + 1 - numpy.frexp((m & -m).astype(numpy.float64))[1])
+    base2 = {0: m[power <= 0] >> k}
+    for p in numpy.unique(power[power > 0]).tolist():
+        base2[p] = m[power == p] >> (k - p)
+    base1 = {0: numpy.unique(numpy.concatenate(idents))}
+    return stability(
+        {p: ns for p, ns in base2.items() if len(ns)}, scale=scale, idents={p: ns for p, ns in base1.items() if len(ns)},
+    )
+
+
+def analysis(shape, *shapes, scale:tuple[int]=(1, 96)):
+    import numpy, scipy.spatial
     scale = tuple(map(int, scale))
-    width = 96 * scale[0] / scale[1]
-    base1 = collections.defaultdict(set)
-    base2 = collections.defaultdict(set)
-    rgb2d = collections.defaultdict(list)
     supheaders = collections.defaultdict(int)
-    supheader = collections.namedtuple("header", "volume vertices count edges config scale")
-    mathtex = collections.namedtuple("mathtex", "approx cdot mathbf epsilon frac dfrac delta Delta")
-    normalize = matplotlib.colors.Normalize(vmin=0)
-    colormap = matplotlib.colormaps["CMRmap"]
+    prototypes, cells, coords, idents = dict(), list(), list(), list()
+    exact = rational(shape, *shapes, scale=scale)
+    for ident, c in expand(shape, *shapes):
+        shape = ident * c.rescale[0] * scale[0] / c.rescale[1] / scale[1]
+        exact or idents.append(ident.ravel())
+        if exact is None and c.rescale[1] == 1 and (isinstance(c.rescale[0], numbers.Integral) or c.rescale[0].is_integer()):
+            coords.append(shape.ravel())
+        if len(shape) < 4:
+            cells.append((shape, c, None))
+            continue
+        key = c.rescale, ident.shape, ((ident - ident.mean(axis=0)).round(6) + 0.0).tobytes()
+        if key not in prototypes:
+            hull = scipy.spatial.ConvexHull(shape)
+            edges, dists = boundary(shape, hull.simplices)
+            prototypes[key] = prototype(
+                simplices=hull.simplices,
+                facets=numpy.unique(hull.equations.round(6) + 0.0, axis=0, return_inverse=True)[1].ravel(),
+                vertices=hull.vertices,
+                volume=hull.volume,
+                edges=edges,
+                dists=dists,
+            )
+        hull = prototypes[key]
+        cells.append((shape, c, hull))
+        hscale = (c.rescale[0]*scale[0], c.rescale[1]*scale[1])
+        if isinstance(c.rescale[0], numbers.Integral):
+            hscale = (hscale[0]//math.gcd(*hscale), hscale[1]//math.gcd(*hscale))
+        supheaders[supheader(
+            count=-1,
+            scale=hscale,
+            edges=(*hull.dists.tolist(),),
+            vertices=len(hull.vertices),
+            volume=round(hull.volume, 4),
+            config=c,
+        )] += 1
+    tally("analysis", cells=len(cells), hulls=len(prototypes))
+    return analyzed(
+        cells=cells,
+        supheaders=sorted(h._replace(count=c) for h, c in supheaders.items()),
+        epsilon=exact or stability(numpy.concatenate((*coords, ())), scale=scale, idents=numpy.concatenate((*idents, ()))),
+    )
+
+analyzed = collections.namedtuple("analyzed", "cells supheaders epsilon")
+prototype = collections.namedtuple("prototype", "simplices facets vertices volume edges dists")
+supheader = collections.namedtuple("header", "volume vertices count edges config scale")
+
+
+def regime(scale, base2rat):
+    return (
+        "integer" if base2rat[1] == 1 else
+        "binary" if scale[0] == 1 and scale == base2rat else
+        "stable" if scale == base2rat else
+        "unstable"
+    )
+
+
+def encode(points, scale:tuple[int]=(1, 96), stix:bool=False, chunk:int=2**14):
+    import numpy
+    points = numpy.reshape(numpy.asarray(points, dtype=numpy.float64), (-1, 3))
+    unit = 24 * scale[0] / scale[1]
+    sites = numpy.array(A)
+    lattices = numpy.unique(numpy.where(sites & 1, 2, sites >> 1), axis=0)
+    steps = numpy.where(lattices[..., None] == 2, 1, 2 * numpy.abs(lattices[..., None] - (0, 1))).ravel().astype(float)
+    residues = numpy.array(K)
+    ids, residuals = numpy.empty(len(points), dtype=numpy.int64), numpy.empty_like(points)
+    for lo in range(0, len(points), chunk):
+        p = points[lo:lo+chunk]
+        g = numpy.multiply(p.T, 1 / unit, order="C")
+        m = numpy.rint(g * 0.5)
+        d = g - 2 * m
+        b = m * 0.5
+        b -= numpy.floor(b)
+        b *= 2
+        if stix:
+            k = numpy.stack((b[1] * (1 - b[2]), b[2] * (1 - b[0]), b[0] * (1 - b[1])))
+        else:
+            a = numpy.abs(d)
+            w = 4 - 4 * a
+            bw = b * w
+            term = (bw, w - bw, 1 - 2 * a)
+            best, j = None, numpy.zeros(len(p), dtype=numpy.intp)
+            for i, (cx, cy, cz) in enumerate(lattices):
+                cost = term[cx][0] + term[cy][1]
+                cost += term[cz][2]
+                if best is None:
+                    best = cost
+                    continue
+                j[cost < best] = i
+                numpy.minimum(best, cost, out=best)
+            k = steps[j * 6 + (b + ((0,), (2,), (4,))).astype(numpy.intp)]
+        xyz = (2 * m + numpy.copysign(k, d)).astype(numpy.int64)
+        cube = (xyz >> 2) + 2**19
+        if (cube >> 20).any():
+            raise ValueError(f"points beyond the {2**21*unit} encodable extent")
+        ids[lo:lo+chunk] = cube[0] << 43 | cube[1] << 23 | cube[2] << 3 | residues[(xyz[0] & 3) << 4 | (xyz[1] & 3) << 2 | xyz[2] & 3]
+        residuals[lo:lo+chunk] = p - xyz.T * (24 * scale[0]) / scale[1]
+    return encoded(ids=ids, residuals=residuals)
+
+encoded = collections.namedtuple("encoded", "ids residuals")
+
+
+def decode(ids, scale:tuple[int]=(1, 96)):
+    import numpy
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    xyz = (numpy.stack((ids >> 43, ids >> 23, ids >> 3), axis=-1) & (2**20 - 1)) - 2**19
+    return (xyz * 4 + numpy.array(A)[ids & 7]) * (24 * scale[0]) / scale[1]
+
+
+def pack(path:str, ids, scale:tuple[int]=(1, 96), stix:bool=False, epsilon:float=math.nan, varint:bool=False,
+         order:str="xmajor"):
+    import numpy, collections.abc
+    header = numpy.zeros((), dtype=H)
+    header["magic"], header["version"], header["stix"], header["varint"] = b"A15i", 1, stix, varint
+    header["order"] = ("xmajor", "morton").index(order)
+    count, last, worst = 0, 0, None
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        for chunk in ids if isinstance(ids, collections.abc.Iterator) else (ids,):
+            if isinstance(chunk, encoded):
+                r = chunk.residuals
+                r = numpy.abs(r).max(axis=-1) if stix else numpy.sqrt((r * r).sum(axis=-1))
+                worst = max(worst or 0.0, float(r.max(initial=0)))
+                chunk = chunk.ids
+            chunk = numpy.ravel(numpy.asarray(chunk, dtype=numpy.int64))
+            chunk = morton(chunk) if order == "morton" else chunk
+            if varint:
+                delta = numpy.diff(chunk, prepend=last)
+                f.write(leb128((delta << 1) ^ (delta >> 63)).tobytes())
+                last = chunk[-1] if len(chunk) else last
+            else:
+                chunk.astype("<i8").tofile(f)
+            count += len(chunk)
+        header["count"], header["scale"] = count, scale
+        header["epsilon"] = worst if math.isnan(epsilon) and worst is not None else epsilon
+        f.seek(0)
+        f.write(header.tobytes())
+        return f.seek(0, os.SEEK_END)
+
+
+def unpack(path:str, chunk:int|None=None):
+    import numpy
+    header = numpy.fromfile(path, dtype=H, count=1)
+    if len(header) != 1 or header[0]["magic"] != b"A15i":
+        raise ValueError(f"{path} is not a packed A15 file")
+    header = header[0]
+    count, offset = int(header["count"]), numpy.dtype(H).itemsize
+    if header["varint"]:
+        ids = varints(path, offset, count, chunk or max(1, os.path.getsize(path) - offset), morton=bool(header["order"]))
+        ids = ids if chunk else numpy.concatenate((numpy.empty(0, dtype=numpy.int64), *ids))
+    else:
+        fixed = numpy.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(count,)) if count else numpy.empty(0, "<i8")
+        ids = (fixed[lo:lo+chunk] for lo in range(0, count, chunk)) if chunk else fixed
+        ids = ((unmorton(i) for i in ids) if chunk else unmorton(ids)) if header["order"] else ids
+    return packed(
+        scale=(*map(int, header["scale"]),), stix=bool(header["stix"]), epsilon=float(header["epsilon"]), count=count,
+        order=("xmajor", "morton")[header["order"]], ids=ids,
+    )
+
+packed = collections.namedtuple("packed", "scale stix epsilon count order ids")
+
+
+def varints(path:str, offset:int, count:int, chunk:int, morton:bool=False):
+    import numpy
+    last, rest = 0, numpy.empty(0, dtype=numpy.uint8)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while count:
+            data = numpy.fromfile(f, dtype=numpy.uint8, count=chunk)
+            if not len(data):
+                raise ValueError(f"{path} is truncated ({count} IDs missing)")
+            data = numpy.concatenate((rest, data))
+            zigzag = unleb128(data)[:count]
+            rest = data[numpy.flatnonzero(data < 0x80)[len(zigzag)-1]+1:] if len(zigzag) else data
+            if not len(zigzag):
+                continue
+            ids = numpy.cumsum((zigzag >> 1).astype(numpy.int64) ^ -(zigzag & 1).astype(numpy.int64)) + last
+            last, count = ids[-1], count - len(ids)
+            yield unmorton(ids) if morton else ids
+
+
+def leb128(values):
+    import numpy
+    values = numpy.asarray(values).view(numpy.uint64)
+    groups = values[:, None] >> numpy.arange(0, 64, 7, dtype=numpy.uint64)
+    sizes = numpy.maximum(1, numpy.count_nonzero(groups, axis=1))
+    index = numpy.arange(groups.shape[1])
+    groups = (groups & 0x7f) | numpy.where(index < sizes[:, None] - 1, 0x80, 0).astype(numpy.uint64)
+    return groups[index < sizes[:, None]].astype(numpy.uint8)
+
+
+def unleb128(data):
+    import numpy
+    data = numpy.asarray(data, dtype=numpy.uint8)
+    ends = numpy.flatnonzero(data < 0x80)
+    if not len(ends):
+        return numpy.empty(0, dtype=numpy.uint64)
+    data, starts = data[:ends[-1]+1], numpy.concatenate(((0,), ends[:-1] + 1))
+    shifts = 7 * (numpy.arange(len(data)) - numpy.repeat(starts, ends - starts + 1))
+    return numpy.bitwise_or.reduceat((data & 0x7f).astype(numpy.uint64) << shifts.astype(numpy.uint64), starts)
+
+
+def neighborhood(k:int=2, *, cache=dict()):
+    import numpy
+    if k in cache:
+        return cache[k]
+    sites = numpy.array(A)
+    near = (sites + 4 * numpy.indices((3, 3, 3)).reshape(3, -1).T[:, None] - 4).reshape(-1, 3)
+    first = [[(*o,) for o in near - s if 0 < o @ o <= 6] for s in sites]
+    tables = list()
+    for s in A:
+        rings = [{(0, 0, 0)}]
+        for _ in range(k):
+            rings.append({
+                (o[0] + f[0], o[1] + f[1], o[2] + f[2])
+                for o in rings[-1]
+                for f in first[K[(s[0] + o[0] & 3) << 4 | (s[1] + o[1] & 3) << 2 | s[2] + o[2] & 3]]
+            } - rings[-1] - rings[-2 if len(rings) > 1 else -1])
+        tables.append([sorted(ring, key=lambda o: (o[0]**2 + o[1]**2 + o[2]**2, o)) for ring in rings[1:]])
+    widths = [max(len(t[i]) for t in tables) for i in range(k)]
+    offsets = numpy.zeros((len(A), sum(widths), 3), dtype=numpy.int64)
+    mask = numpy.zeros((len(A), sum(widths)), dtype=bool)
+    for t, rings in enumerate(tables):
+        for lo, ring in zip(itertools.accumulate([0, *widths]), rings):
+            offsets[t, lo:lo+len(ring)], mask[t, lo:lo+len(ring)] = numpy.reshape(ring, (-1, 3)), True
+    xyz = sites[:, None] + offsets
+    cubes = xyz >> 2
+    deltas = cubes @ (2**43, 2**23, 2**3) + numpy.array(K)[(xyz & 3) @ (16, 4, 1)] - numpy.arange(len(A))[:, None]
+    return cache.setdefault(k, tabulated(
+        widths=(*widths,), offsets=offsets, mask=mask, cubes=cubes, deltas=numpy.where(mask, deltas, 0),
+    ))
+
+tabulated = collections.namedtuple("tabulated", "widths offsets mask cubes deltas")
+
+
+def neighbors(ids, shells:int=1, chunk:int=2**14):
+    import numpy
+    table = neighborhood(shells)
+    reach, pad = numpy.abs(table.cubes).max(initial=0), ~table.mask
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    flat = ids.ravel()
+    out = numpy.empty((len(flat), sum(table.widths)), dtype=numpy.int64)
+    for lo in range(0, len(flat), chunk):
+        i, o = flat[lo:lo+chunk], out[lo:lo+chunk]
+        k = i & 7
+        numpy.take(table.deltas, k, axis=0, out=o)
+        o += i[:, None]
+        numpy.putmask(o, numpy.take(pad, k, axis=0), -1)
+        cube = (i[:, None] >> (43, 23, 3)) & (2**20 - 1)
+        edge = numpy.flatnonzero(((cube < reach) | (cube >= 2**20 - reach)).any(axis=-1))
+        cube = cube[edge, None] + table.cubes[k[edge]]
+        o[edge] = numpy.where(((cube < 0) | (cube >> 20)).any(axis=-1), -1, o[edge])
+    return out.reshape(*ids.shape, out.shape[1])
+
+
+def morton(ids, chunk:int=2**14):
+    import numpy
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    flat, keys = ids.ravel().view(numpy.uint64), numpy.empty(ids.size, dtype=numpy.uint64)
+    for lo in range(0, len(flat), chunk):
+        i = flat[lo:lo+chunk]
+        c = (i >> numpy.array(((43,), (23,), (3,)), dtype=numpy.uint64)) & numpy.uint64(2**20 - 1)
+        for s, m in zip((32, 16, 8, 4, 2), (0x1f00000000ffff, 0x1f0000ff0000ff, 0x100f00f00f00f00f, 0x10c30c30c30c30c3, 0x1249249249249249)):
+            c |= c << numpy.uint64(s)
+            c &= numpy.uint64(m)
+        keys[lo:lo+chunk] = c[0] << numpy.uint64(5) | c[1] << numpy.uint64(4) | c[2] << numpy.uint64(3) | i & numpy.uint64(7)
+    return keys.view(numpy.int64).reshape(ids.shape)
+
+
+def unmorton(keys, chunk:int=2**14):
+    import numpy
+    keys = numpy.asarray(keys, dtype=numpy.int64)
+    flat, ids = keys.ravel().view(numpy.uint64), numpy.empty(keys.size, dtype=numpy.uint64)
+    for lo in range(0, len(flat), chunk):
+        k = flat[lo:lo+chunk]
+        c = (k >> numpy.array(((5,), (4,), (3,)), dtype=numpy.uint64)) & numpy.uint64(0x1249249249249249)
+        for s, m in zip((2, 4, 8, 16, 32), (0x10c30c30c30c30c3, 0x100f00f00f00f00f, 0x1f0000ff0000ff, 0x1f00000000ffff, 2**20 - 1)):
+            c |= c >> numpy.uint64(s)
+            c &= numpy.uint64(m)
+        ids[lo:lo+chunk] = c[0] << numpy.uint64(43) | c[1] << numpy.uint64(23) | c[2] << numpy.uint64(3) | k & numpy.uint64(7)
+    return ids.view(numpy.int64).reshape(keys.shape)
+
+
+def box(keys, lo, hi, scale:tuple[int]=(1, 96), order:str="morton"):
+    import numpy
+    lo, hi = numpy.asarray(lo, dtype=numpy.float64), numpy.asarray(hi, dtype=numpy.float64)
+    index, xyz = candidates(keys, lo, hi, scale, order)
+    return index[((xyz >= lo) & (xyz <= hi)).all(axis=-1)]
+
+
+def sphere(keys, center, radius:float, scale:tuple[int]=(1, 96), order:str="morton"):
+    import numpy
+    center = numpy.asarray(center, dtype=numpy.float64)
+    index, xyz = candidates(keys, center - radius, center + radius, scale, order)
+    xyz -= center
+    return index[(xyz * xyz).sum(axis=-1) <= radius * radius]
+
+
+def candidates(keys, lo, hi, scale:tuple[int]=(1, 96), order:str="morton", cells:int=16):
+    import numpy
+    unit = 24 * scale[0] / scale[1]
+    lo = numpy.clip(numpy.ceil((lo / unit - 3) / 4), -2**19, 2**19).astype(numpy.int64) + 2**19
+    hi = numpy.clip(numpy.floor(hi / unit / 4), -2**19 - 1, 2**19 - 1).astype(numpy.int64) + 2**19
+    if (hi < lo).any():
+        return numpy.empty(0, dtype=numpy.intp), numpy.empty((0, 3))
+    if order == "morton":
+        level = 0
+        while ((hi >> level) - (lo >> level) + 1).max() > cells:
+            level += 1
+        grid = numpy.indices((hi >> level) - (lo >> level) + 1).reshape(3, -1).T + (lo >> level)
+        starts = numpy.sort(morton((grid << level) @ (2**43, 2**23, 2**3)))
+        ends = starts + (8 << 3 * level)
+    else:
+        grid = numpy.indices(hi[:2] - lo[:2] + 1).reshape(2, -1).T + lo[:2]
+        starts = grid @ (2**43, 2**23) + (lo[2] << 3)
+        ends = grid @ (2**43, 2**23) + (hi[2] + 1 << 3)
+    joined = numpy.flatnonzero(starts[1:] != ends[:-1]) + 1
+    starts, ends = starts[numpy.r_[0, joined]], ends[numpy.r_[joined - 1, len(ends) - 1]]
+    starts, ends = numpy.searchsorted(keys, starts), numpy.searchsorted(keys, ends)
+    sizes = ends - starts
+    index = numpy.arange(sizes.sum()) + numpy.repeat(starts - numpy.cumsum(sizes) + sizes, sizes)
+    found = keys[index]
+    return index, decode(unmorton(found) if order == "morton" else found, scale)
+
+
+def layout(views:tuple[tuple[int|float]], bars:bool=False):
+    import numpy, matplotlib.pyplot, mpl_toolkits.mplot3d
     figsize = (
         (10-3*bars, 10) if not views else
         (10, 10-bars) if (len(views)**0.5).is_integer() else
@@ -215,7 +760,7 @@ def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]
         left=0, right=1, bottom=0, top=1, hspace=0, wspace=0,
     )
     per_subplot_kw = dict(filter(None, (
-        ((*map(str, range(0, len(views))),), dict(projection="3d")),
+        ((*map(str, range(0, len(views))),), dict(projection="3d", computed_zorder=False)),
         (("B",), dict(projection="rectilinear")) if bars else None,
     )))
     mosaic = numpy.array(
@@ -230,196 +775,585 @@ def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]
         mosaic = mosaic_kwds["mosaic"] = numpy.insert(mosaic, 0, ["B"]*mosaic.shape[0], axis=1) if views else numpy.array([["B"]])
     fig, axs = (None, dict()) if 0 in mosaic.shape else matplotlib.pyplot.subplot_mosaic(**mosaic_kwds)
     fs = (figsize[0]**2 + figsize[1]**2)**0.5 + min(figsize)/(len(views)+1)
-    mtx = mathtex(*(fr"\{field}" for field in mathtex._fields))
-    alpha = (3*math.log2(2+len(shapes)))**-1
-    bbox_extra_artists = list()
-    for ident, c in (shape, *shapes):
-        shape = ident * c.rescale[0] * scale[0] / c.rescale[1] / scale[1]
-        for vn in numpy.nditer(ident):
-            vn = float(vn).as_integer_ratio()
-            base1[int(math.log2(vn[1]))].add(abs(vn[0]))
-        if c.rescale[1] == 1 and (isinstance(c.rescale[0], numbers.Integral) or c.rescale[0].is_integer()):
-            for vn in numpy.nditer(shape):
-                vn = float(vn).as_integer_ratio()
-                base2[int(math.log2(vn[1]))].add(abs(vn[0]))
+    return fig, axs, mosaic, figsize, figrats, fs
+
+
+def occluded(shape, *shapes):
+    import numpy
+    if isinstance(shape, shaped):
+        mids = numpy.reshape([p.min(axis=0) + p.max(axis=0) for p in shape.prototypes], (-1, 3))[shape.index]
+        mids += 2 * shape.translations
+        sizes = numpy.array([len(p) for p in shape.prototypes], dtype=int)[shape.index]
+        configs, config = shape.configs, shape.config
+    else:
+        shapes = (shape, *shapes)
+        mids = numpy.reshape([ident.min(axis=0) + ident.max(axis=0) for ident, _ in shapes], (-1, 3))
+        sizes = numpy.array([len(ident) for ident, _ in shapes], dtype=int)
+        configs, config = [c for _, c in shapes], numpy.arange(len(shapes))
+    hidden = numpy.zeros(len(mids), dtype=bool)
+    solid = numpy.array([bool(c.faces and c.opaque) for c in configs])[config] & (sizes >= 4)
+    for rescale in {c.rescale for c in configs}:
+        index = numpy.flatnonzero(solid & numpy.array([c.rescale == rescale for c in configs])[config])
+        e = encode(mids[index] / 2, scale=(1, 1))
+        sited = numpy.isclose(e.residuals, 0).all(axis=-1)
+        index, ids = index[sited], e.ids[sited]
+        near = neighbors(ids, shells=1)
+        hidden[index] = (numpy.isin(near, ids) | (near < 0)).all(axis=-1)
+    return hidden
+
+
+def staging(summary:tuple, fs:float, alpha:float, hidden=None, mesh:bool=False):
+    import numpy, matplotlib
+    rgb2d, rowners = collections.defaultdict(list), collections.defaultdict(list)
+    polys, lines, powners, lowners = list(), list(), list(), list()
+    dots, marks, mowners = collections.defaultdict(list), collections.defaultdict(list), collections.defaultdict(list)
+    cycle = itertools.cycle(matplotlib.rcParams["axes.prop_cycle"].by_key()["color"])
+    normalize = matplotlib.colors.Normalize(vmin=0)
+    palette = dict()
+    for j, ((shape, c, hull), skip) in enumerate(zip(summary.cells, itertools.repeat(False) if hidden is None else hidden)):
+        if skip:
+            continue
         res = operator.truediv(*c.rescale)
-        if len(shape) < 4:
+        if hull is None:
             fsz = fs * math.log(1 + res)
-            for ax in axs:
-                if not ax.isdigit():
-                    continue
-                if len(shape) != 3:
-                    if c.verts:
-                        xs, ys, zs = shape[:, 0], shape[:, 1], shape[:, 2]
-                        axs[ax].scatter(xs=xs, ys=ys, zs=zs, s=fsz, c="#1a1a1a", alpha=1/4, marker="o")
-                elif c.lines:
-                    rgb2d[(fsz, "B" if c.centers else "b", shape[0][0], shape[0][1])].append(tuple(shape[0]))
-                    rgb2d[(fsz, "R" if c.centers else "r", shape[1][1], shape[1][2])].append(tuple(shape[1]))
-                    rgb2d[(fsz, "G" if c.centers else "g", shape[2][0], shape[2][2])].append(tuple(shape[2]))
-                elif c.centers:
-                    axkwds = dict(ms=fsz/6, linestyle="none", alpha=1/4)
-                    axs[ax].plot(xs=shape[0][0], ys=shape[0][1], zs=shape[0][2], c="b", marker="^", **axkwds)
-                    axs[ax].plot(xs=shape[1][0], ys=shape[1][1], zs=shape[1][2], c="r", marker=">", **axkwds)
-                    axs[ax].plot(xs=shape[2][0], ys=shape[2][1], zs=shape[2][2], c="g", marker="<", **axkwds)
+            if len(shape) != 3:
+                if c.verts:
+                    dots[("o", 1/4)].append((shape, fsz, "#1a1a1a", j))
+            elif c.lines:
+                for key, xyz in (
+                    ((fsz, "B" if c.centers else "b", shape[0][0], shape[0][1]), shape[0]),
+                    ((fsz, "R" if c.centers else "r", shape[1][1], shape[1][2]), shape[1]),
+                    ((fsz, "G" if c.centers else "g", shape[2][0], shape[2][2]), shape[2]),
+                ):
+                    rgb2d[key].append(tuple(xyz))
+                    rowners[key].append(j)
+            elif c.centers:
+                for key, xyz in ((("b", "^", fsz/6), shape[0]), (("r", ">", fsz/6), shape[1]), (("g", "<", fsz/6), shape[2])):
+                    marks[key].append(xyz)
+                    mowners[key].append(j)
             continue
-        hull = scipy.spatial.ConvexHull(shape)
-        color = matplotlib.colormaps[c.colormap]((normalize(hull.volume)+0.25)/1.50)
-        normals = collections.defaultdict(functools.partial(collections.defaultdict, int))
-        for xyz in hull.simplices:
-            if c.faces:
-                for ax in axs:
-                    if not ax.isdigit():
-                        continue
-                    axs[ax].add_collection3d(mpl_toolkits.mplot3d.art3d.Poly3DCollection(
-                        [shape[xyz]], color=color, alpha=alpha, linewidths=0,
-                    ))
-            curr = shape[xyz[1]] - shape[xyz[2]]
-            for l, r in itertools.combinations([0, 1, 2], 2):
-                last, curr = curr, shape[xyz[l]] - shape[xyz[r]]
-                norm = (numpy.cross(last, curr)/numpy.linalg.norm(numpy.cross(last, curr))).round(4)
-                normals[frozenset([tuple(norm), tuple(-norm)])][(xyz[l], xyz[r], round(sum(curr**2)**0.5, 4))] += 1
-        dists = set()
-        for k in normals:
-            es = normals[k]
-            for k2 in es:
-                if es[k2] != 1:
-                    continue
-                start, end, dist = k2
-                dists.add(dist)
-                if not c.edges:
-                    continue
-                color, zorder, lw = "#040404", 1, 1
-                xs, ys, zs = shape[[start, end], 0], shape[[start, end], 1], shape[[start, end], 2]
-                for ax in axs:
-                    if not ax.isdigit():
-                        continue
-                    axs[ax].plot(xs=xs, ys=ys, zs=zs, zorder=zorder, color=color, lw=lw, alpha=alpha*3/4)
+        if (c.colormap, hull.volume) not in palette:
+            palette[c.colormap, hull.volume] = matplotlib.colormaps[c.colormap]((normalize(hull.volume)+0.25)/1.50)
+        color = palette[c.colormap, hull.volume]
+        if c.faces:
+            polys.append((shape, hull, matplotlib.colors.to_rgba(color, 1 if c.opaque else alpha)))
+            powners.append(j)
+        if c.edges:
+            lines.append(shape[hull.edges])
+            lowners.append(j)
         if c.centers or c.verts or (c.faces and not c.edges):
             ls = len(shape)
             vertices = shape[hull.vertices]
-            xs, ys, zs = vertices[:, 0], vertices[:, 1], vertices[:, 2]
             centered = c.centers and ls % 2 == 1 and ls != len(vertices)
-            for ax in axs:
-                if not ax.isdigit():
-                    continue
-                if c.verts:
-                    axs[ax].scatter(xs=xs, ys=ys, zs=zs, s=fs*math.log(1+res)/3, marker=".")
-                elif c.faces:
-                    axs[ax].scatter(xs=xs, ys=ys, zs=zs, s=0, marker=".")
-                if centered:
-                    axs[ax].scatter(
-                        xs=shape[ls//2, 0:1], ys=shape[ls//2, 1:2], zs=shape[ls//2, 2:3], s=fs*math.log(1+res),
-                        c="#1a1a1a", alpha=1/4, marker="h" if shape[ls//2, 0:1] % 2 else "H",
-                    )
-        hscale = (c.rescale[0]*scale[0], c.rescale[1]*scale[1])
-        if isinstance(c.rescale[0], numbers.Integral):
-            hscale = (hscale[0]//math.gcd(*hscale), hscale[1]//math.gcd(*hscale))
-        supheaders[supheader(
-            count=-1,
-            scale=hscale,
-            edges=tuple(sorted(dists)),
-            vertices=len(hull.vertices),
-            volume=round(hull.volume, 4),
-            config=c,
-        )] += 1
-    for i, ax in axs.items():
+            if c.verts:
+                dots[(".", None)].append((vertices, fs*math.log(1+res)/3, next(cycle), j))
+            elif c.faces:
+                dots[(".", None)].append((vertices, 0, next(cycle), j))
+            if centered:
+                dots[("h" if shape[ls//2, 0:1] % 2 else "H", 1/4)].append(
+                    (shape[ls//2:ls//2+1], fs*math.log(1+res), "#1a1a1a", j),
+                )
+    owners = None if mesh or numpy.any(hidden) else dict(
+        polys=numpy.repeat(powners, [len(hull.simplices) for _, hull, _ in polys]).astype(int),
+        sizes=numpy.array(powners, dtype=int),
+        lines=numpy.repeat(lowners, [len(segs) for segs in lines]).astype(int),
+        dots={key: numpy.concatenate([numpy.full(len(vs), j) for vs, _, _, j in group]) for key, group in dots.items()},
+        marks={key: numpy.array(js) for key, js in mowners.items()},
+        rgb2d={key: earliest(numpy.array(rgb2d[key]), js) for key, js in rowners.items()},
+    )
+    points = [
+        *(vs for vs, _, _, _ in itertools.chain(*dots.values())),
+        *(shape[hull.vertices] for shape, hull, _ in polys), *lines, *itertools.chain(*marks.values(), *rgb2d.values()),
+    ]
+    points = numpy.concatenate([numpy.reshape(p, (-1, 3)) for p in points]) if points else None
+    tris, colors, sizes = merged(polys) if mesh and polys else (
+        numpy.concatenate([shape[hull.simplices] for shape, hull, _ in polys]),
+        numpy.concatenate([numpy.tile(rgba, (len(hull.simplices), 1)) for _, hull, rgba in polys]),
+        numpy.array([len(hull.simplices) for _, hull, _ in polys]),
+    ) if polys else (None, None, None)
+    lines = numpy.concatenate(lines) if lines else None
+    if mesh and lines is not None:
+        lines = lines[numpy.sort(distinct(undirected(lines).reshape(-1, 6))[0])]
+    dots = {
+        key: (
+            numpy.concatenate([vs for vs, _, _, _ in group]),
+            numpy.concatenate([numpy.full(len(vs), s) for vs, s, _, _ in group]),
+            numpy.concatenate([numpy.tile(matplotlib.colors.to_rgba(rgb), (len(vs), 1)) for vs, _, rgb, _ in group]),
+        )
+        for key, group in dots.items()
+    }
+    if mesh:
+        dots = {key: tuple(a[numpy.sort(distinct(group[0])[0])] for a in group) for key, group in dots.items()}
+    tally("staging", triangles=0 if tris is None else len(tris), lines=0 if lines is None else len(lines))
+    return staged(
+        polys=tris,
+        colors=colors,
+        sizes=sizes,
+        lines=lines,
+        alpha=alpha,
+        dots=dots,
+        marks={key: numpy.array(points) for key, points in marks.items()},
+        rgb2d={key: numpy.unique(line, axis=0) for key, line in rgb2d.items()},
+        bounds=None if points is None else numpy.array([numpy.min(points, axis=0), numpy.max(points, axis=0)]),
+        owners=owners,
+    )
+
+staged = collections.namedtuple("staged", "polys colors sizes lines alpha dots marks rgb2d bounds owners")
+
+
+def earliest(rows, owners):
+    import numpy
+    _, inverse = numpy.unique(rows, axis=0, return_inverse=True)
+    first = numpy.full(inverse.max(initial=-1) + 1, len(rows))
+    numpy.minimum.at(first, numpy.reshape(inverse, -1), owners)
+    return first
+
+
+def trimmed(stage:tuple, k:int):
+    o = stage.owners
+    polys, lines = o["polys"] < k, o["lines"] < k
+    kept = lambda group, owners: {key: owners[key] < k for key in group if (owners[key] < k).any()}
+    dots, marks, rgb2d = kept(stage.dots, o["dots"]), kept(stage.marks, o["marks"]), kept(stage.rgb2d, o["rgb2d"])
+    return stage._replace(
+        polys=stage.polys[polys] if polys.any() else None,
+        colors=stage.colors[polys] if polys.any() else None,
+        sizes=stage.sizes[o["sizes"] < k] if polys.any() else None,
+        lines=stage.lines[lines] if lines.any() else None,
+        dots={key: tuple(a[keep] for a in stage.dots[key]) for key, keep in dots.items()},
+        marks={key: stage.marks[key][keep] for key, keep in marks.items()},
+        rgb2d={key: stage.rgb2d[key][keep] for key, keep in rgb2d.items()},
+        owners=dict(
+            polys=o["polys"][polys], sizes=o["sizes"][o["sizes"] < k], lines=o["lines"][lines],
+            dots={key: o["dots"][key][keep] for key, keep in dots.items()},
+            marks={key: o["marks"][key][keep] for key, keep in marks.items()},
+            rgb2d={key: o["rgb2d"][key][keep] for key, keep in rgb2d.items()},
+        ),
+    )
+
+
+def merged(polys):
+    import numpy
+    shapes = numpy.concatenate([shape for shape, _, _ in polys])
+    base = numpy.cumsum([0, *(len(shape) for shape, _, _ in polys)])
+    fbase = numpy.cumsum([0, *(hull.facets.max() + 1 for _, hull, _ in polys)])
+    tri = numpy.concatenate([hull.simplices + b for (_, hull, _), b in zip(polys, base)])
+    facet = numpy.concatenate([hull.facets + f for (_, hull, _), f in zip(polys, fbase)])
+    rgba = numpy.repeat([rgba for _, _, rgba in polys], numpy.diff(fbase), axis=0)
+    _, vid = distinct(shapes)
+    pairs = numpy.unique(numpy.repeat(facet, 3) * len(shapes) + vid[tri].ravel())
+    pairs = numpy.column_stack((pairs // len(shapes), pairs % len(shapes)))
+    counts = numpy.bincount(pairs[:, 0], minlength=fbase[-1])
+    rows = numpy.full((fbase[-1], counts.max()), -1)
+    rows[pairs[:, 0], numpy.arange(len(pairs)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)] = pairs[:, 1]
+    first, face = distinct(rows)
+    solid = rgba[:, 3] >= 1
+    sums = lambda weights: numpy.bincount(face, weights, minlength=len(first))
+    count, a = sums(solid), numpy.where(solid, 0, rgba[:, 3])
+    colors = numpy.column_stack((
+        *(numpy.where(count > 0, sums(solid * rgba[:, k]) / numpy.maximum(count, 1),
+                      sums(a * rgba[:, k]) / numpy.maximum(sums(a), 2**-52)) for k in range(3)),
+        numpy.where(count > 0, 1, 1 - numpy.exp(sums(numpy.log1p(-a)))),
+    ))
+    keep = (first[face[facet]] == facet) & (count < 2)[face[facet]]
+    return shapes[tri[keep]], colors[face[facet[keep]]], None
+
+
+def distinct(rows):
+    import numpy
+    order = numpy.lexsort(rows.T[::-1])
+    new = numpy.concatenate(([True], (rows[order[1:]] != rows[order[:-1]]).any(axis=1)))
+    inverse = numpy.empty(len(rows), dtype=int)
+    inverse[order] = numpy.cumsum(new) - 1
+    return order[new], inverse
+
+
+def undirected(segs):
+    import numpy
+    d = segs[:, 0] - segs[:, 1]
+    return numpy.where((d[numpy.arange(len(d)), (d != 0).argmax(axis=1)] > 0)[:, None, None], segs[:, ::-1], segs)
+
+
+def draw(ax, stage:tuple):
+    import mpl_toolkits.mplot3d
+    for (marker, opacity), (xyz, size, rgba) in stage.dots.items():
+        ax.scatter(xs=xyz[:, 0], ys=xyz[:, 1], zs=xyz[:, 2], s=size, c=rgba, alpha=opacity, marker=marker, zorder=2.5)
+    if stage.polys is not None:
+        ax.add_collection3d(mpl_toolkits.mplot3d.art3d.Poly3DCollection(
+            stage.polys, zsort="min", linewidths=0, zorder=3, facecolors=stage.colors, edgecolors=stage.colors,
+        ))
+    if stage.lines is not None:
+        ax.add_collection3d(mpl_toolkits.mplot3d.art3d.Line3DCollection(
+            stage.lines, zorder=1, color="#040404", lw=1, alpha=stage.alpha*3/4,
+        ))
+    for (color, marker, ms), points in stage.marks.items():
+        ax.plot(xs=points[:, 0], ys=points[:, 1], zs=points[:, 2], c=color, marker=marker, ms=ms,
+                linestyle="none", alpha=1/4)
+    for (sz, rgb, _, _), line in stage.rgb2d.items():
+        marker = "^" if rgb == "B" else ">" if rgb == "R" else "<" if rgb == "G" else "none"
+        ax.plot(xs=line[:, 0], ys=line[:, 1], zs=line[:, 2], linewidth=sz/12, alpha=1/4,
+                marker=marker, ms=sz/6, c=rgb.lower())
+
+
+def frame(ax, i:int, views:tuple[tuple[int|float]], fs:float, width:float, axes:bool=False):
+    import numpy, matplotlib.ticker
+    view, bbox_extra_artists = views[i], list()
+    ax.grid(False)
+    ax.tick_params(pad=fs/8, labelsize=fs/2)
+    ax.margins(*(0,)*len(ax._axis_names))
+    formatter = lambda value, xy: f"${value/width:.0f}$"
+    locator = matplotlib.ticker.MultipleLocator(base=width)
+    ax.xaxis.set_major_formatter(formatter)
+    ax.yaxis.set_major_formatter(formatter)
+    ax.zaxis.set_major_formatter(formatter)
+    ax.xaxis.set_major_locator(locator)
+    ax.yaxis.set_major_locator(locator)
+    ax.zaxis.set_major_locator(locator)
+    ax.xaxis.set_pane_color((0, 0, 0, 0))
+    ax.yaxis.set_pane_color((0, 0, 0, 0))
+    ax.zaxis.set_pane_color((0, 0, 0, 1/30))
+    ax.xaxis.line.set_color("r")
+    ax.yaxis.line.set_color("g")
+    ax.zaxis.line.set_color("b")
+    ax.set_proj_type("ortho")
+    ax.set_zorder(len(views)-i)
+    ax.set_box_aspect(aspect=(1, 1, 1))
+    ax.set_xlabel("$N_{X}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="r", clip_on=False)
+    ax.set_ylabel("$N_{Y}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="g", clip_on=False)
+    ax.set_zlabel("$N_{Z}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="b", clip_on=False)
+    bbox_extra_artists.extend((ax.xaxis.label, ax.yaxis.label, ax.zaxis.label))
+    if view[0] in (90, 270):
+        ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
+        ax.yaxis._axinfo['juggled'] = (2, 1, 0)
+        ax.set_zticklabels([])
+        ax.set_zlabel("")
+        ax.set_zticks([])
+    elif view[0] in (0, 180) and view[1] in (90, 270):
+        ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
+        ax.zaxis._axinfo['juggled'] = (1, 2, 0)
+        ax.set_yticklabels([])
+        ax.set_ylabel("")
+        ax.set_yticks([])
+    elif view[0] in (0, 180) and view[1] in (0, 180):
+        ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
+        ax.set_xticklabels([])
+        ax.set_xlabel("")
+        ax.set_xticks([])
+    for axinfo in (ax.xaxis._axinfo, ax.yaxis._axinfo, ax.zaxis._axinfo):
+        axinfo["tick"]["inward_factor"], axinfo["tick"]["outward_factor"] = 0.0, 0.0
+    if axes:
+        golden = math.degrees(R["G06"])
+        bbox_extra_artists.append(ax.text2D(
+            x=1+2**-8, y=1-2**-5, transform=ax.transAxes, va="top",
+            ha="right", fontsize=fs*0.75, color="#1a1a1a",
+            s=r"$%s_{azim}\ %s_{elev}\ \mathbf{%s}$" % (
+                r"\Phi-1" if view[1] == golden else fr"{view[1]}^\circ",
+                r"\Phi-1" if view[0] == golden else fr"{view[0]}^\circ",
+                ax.name if ax.name != "3d" else "ortho" if ax._focal_length == numpy.inf else "persp",
+            ),
+        ))
+    else:
+        ax.zaxis.set_pane_color((0, 0, 0, 0))
+        ax.xaxis.line.set_color("none")
+        ax.yaxis.line.set_color("none")
+        ax.zaxis.line.set_color("none")
+        ax.set_xticklabels([])
+        ax.set_xlabel("")
+        ax.set_xticks([])
+        ax.set_yticklabels([])
+        ax.set_ylabel("")
+        ax.set_yticks([])
+        ax.set_zticklabels([])
+        ax.set_zlabel("")
+        ax.set_zticks([])
+    xyzmm = max(map(abs, itertools.chain(ax.get_xlim(), ax.get_ylim(), ax.get_zlim())))
+    ax.set_xlim(-xyzmm, xyzmm)
+    ax.set_ylim(-xyzmm, xyzmm)
+    ax.set_zlim(-xyzmm, xyzmm)
+    ax.view_init(*view)
+    return bbox_extra_artists
+
+
+def panel(i:int, stage:tuple, views:tuple[tuple[int|float]], bars:bool=False, axes:bool=False, width:float=1.0):
+    import numpy, matplotlib.pyplot
+    fig, axs, *_, fs = layout(views, bars)
+    try:
+        ax = axs[str(i)]
+        draw(ax, stage)
+        frame(ax, i, views=views, fs=fs, width=width, axes=axes)
+        ax.set_axis_off()
+        fig.patch.set_visible(False)
+        ax.patch.set_visible(False)
+        for artist in (*axs.values(), *ax.texts):
+            artist is ax or artist.set_visible(False)
+        fig.canvas.draw()
+        x0, y0, x1, y1 = extents = ax.bbox.extents
+        x0, y0, x1, y1 = math.floor(x0), math.floor(y0), math.ceil(x1), math.ceil(y1)
+        buffer = numpy.asarray(fig.canvas.buffer_rgba())
+        count = len(ax.collections) + len(ax.lines)
+        return buffer[len(buffer)-y1:len(buffer)-y0, x0:x1].copy(), numpy.subtract((x0, y0, x1, y1), extents), count
+    finally:
+        matplotlib.pyplot.close(fig)
+
+
+def projection(ax):
+    import numpy, mpl_toolkits.mplot3d.proj3d
+    ax.apply_aspect()
+    xyz = numpy.vstack(((0, 0, 0), numpy.eye(3))) * max(map(abs, ax.get_xlim()))
+    x, y, z = mpl_toolkits.mplot3d.proj3d.proj_transform(*xyz.T, ax.get_proj())
+    uvd = numpy.vstack((ax.transData.transform(numpy.column_stack((x, y))).T, z))
+    linear = (uvd[:, 1:] - uvd[:, :1]) / xyz[1, 0]
+    uvd[2] *= numpy.linalg.norm(linear[0]) / numpy.linalg.norm(linear[2])
+    linear[2] *= numpy.linalg.norm(linear[0]) / numpy.linalg.norm(linear[2])
+    return numpy.column_stack((linear, uvd[:, 0]))
+
+
+def raster(stage:tuple, proj, extents:tuple[float], dpi:float=300, chunk:int=2**22, slab:float=4):
+    import numpy, matplotlib.colors
+    x0, y0, x1, y1 = math.floor(extents[0]), math.floor(extents[1]), math.ceil(extents[2]), math.ceil(extents[3])
+    pt = dpi / 72
+    project = lambda xyz: (xyz @ proj[:, :3].T + proj[:, 3] - (x0, y1, 0)) * (1, -1, 1)
+    rgba = lambda color, alpha, n: numpy.broadcast_to(matplotlib.colors.to_rgba(color, alpha), (n, 4))
+    polys, segs, discs = list(), list(), [(numpy.empty((0, 3)), numpy.empty((0, 4)), numpy.empty(0))]
+    if stage.polys is not None:
+        polys.extend(outlines(project(stage.polys), stage.colors, stage.sizes))
+    if stage.lines is not None:
+        segs.append((stage.lines, rgba("#040404", stage.alpha*3/4, len(stage.lines)), pt/2))
+    for (sz, rgb, _, _), line in stage.rgb2d.items():
+        segs.append((numpy.stack((line[:-1], line[1:]), axis=1), rgba(rgb.lower(), 1/4, len(line)-1), pt*sz/24))
+        rgb.isupper() and discs.append((project(line), rgba(rgb.lower(), 1/4, len(line)), numpy.full(len(line), pt*sz/12)))
+    for (marker, opacity), (xyz, size, colors) in stage.dots.items():
+        colors = colors if opacity is None else numpy.column_stack((colors[:, :3], numpy.full(len(colors), opacity)))
+        discs.append((project(xyz[size > 0]), colors[size > 0], pt * size[size > 0]**0.5 / (4 if marker == "." else 2)))
+    for (color, marker, ms), points in stage.marks.items():
+        discs.append((project(points), rgba(color, 1/4, len(points)), numpy.full(len(points), pt*ms/2)))
+    for xyz, colors, r in filter(lambda seg: len(seg[0]), segs):
+        first, inverse = distinct(numpy.column_stack((undirected(xyz).reshape(-1, 6), colors)))
+        p, r = project(undirected(xyz[first])), max(r, 1/2)
+        off = numpy.column_stack((p[:, 0, 1] - p[:, 1, 1], p[:, 1, 0] - p[:, 0, 0], numpy.zeros(len(p))))
+        off *= r / numpy.maximum(numpy.hypot(off[:, 0], off[:, 1]), 1e-9)[:, None]
+        quads = numpy.stack((p[:, 0] + off, p[:, 1] + off, p[:, 1] - off, p[:, 0] - off), axis=1) - (0, 0, r)
+        polys.append((quads, colors[first], numpy.bincount(inverse)))
+    disc, disccolors, radii = map(numpy.concatenate, zip(*discs))
+    radii = numpy.maximum(radii, 1/2)
+    bands = [trapezoids(p) for p, _, _ in polys]
+    colors = numpy.concatenate([c for _, c, _ in polys] + [disccolors])
+    weight = numpy.concatenate([m for _, _, m in polys] + [numpy.ones(len(disc))])
+    plane = numpy.concatenate([planes(p) for p, _, _ in polys] + [numpy.column_stack((0 * disc[:, :2], disc[:, 2] - radii))])
+    near = numpy.concatenate([p[..., 2].min(axis=1) for p, _, _ in polys] + [disc[:, 2] - radii])
+    owner = numpy.concatenate([numpy.repeat(numpy.arange(len(b)), b.shape[1]) for b in bands] + [numpy.arange(len(disc))])
+    owner += numpy.repeat(numpy.cumsum([0, *(len(p) for p, _, _ in polys)]),
+                          [b.shape[0] * b.shape[1] for b in bands] + [len(disc)])
+    units = numpy.concatenate([b.reshape(-1, 8) for b in bands] + [numpy.column_stack((
+        disc[:, 1] - radii, disc[:, 1] + radii, disc[:, 0], disc[:, 1], radii, disc[:, 0], disc[:, 1], numpy.nan * radii,
+    ))])
+    spread = numpy.where(numpy.isnan(units[:, 7]), units[:, 4], abs(units[:, [4, 7]]).max(axis=1) * (units[:, 1] - units[:, 0]))
+    lo = numpy.column_stack((numpy.minimum(units[:, 2], units[:, 5]) - spread, units[:, 0]))
+    hi = numpy.column_stack((numpy.maximum(units[:, 2], units[:, 5]) + spread, units[:, 1]))
+    lo, hi = numpy.clip(numpy.floor(lo), 0, (x1 - x0, y1 - y0)), numpy.clip(numpy.ceil(hi), 0, (x1 - x0, y1 - y0))
+    area = numpy.prod(numpy.maximum(hi - lo, 0), axis=1) * numpy.isfinite(plane[owner]).all(axis=1)
+    crop = (*lo[area > 0].min(axis=0), *hi[area > 0].max(axis=0)) if area.any() else (0, 0, 0, 0)
+    units[:, [0, 1, 3, 6]] -= crop[1]
+    units[:, [2, 5]] -= crop[0]
+    plane[:, 2] += plane[:, 0] * crop[0] + plane[:, 1] * crop[1]
+    x0, y0, x1, y1 = x0 + int(crop[0]), y1 - int(crop[3]), x0 + int(crop[2]), y1 - int(crop[1])
+    w, h, units = x1 - x0, y1 - y0, units.astype(numpy.float32)
+    dmin, dmax = (near[owner[area > 0]].min(), plane[owner[area > 0], 2].max() + 1) if area.any() else (0, 1)
+    quantum = (dmax - dmin) / 2**30
+    zkey = numpy.full(w * h, numpy.iinfo(numpy.int64).max)
+    opaque = colors[owner, 3] >= 1
+    for batch in batches(numpy.flatnonzero(opaque & (area > 0)), area, chunk):
+        prim, pix, depth = pixels(*spans(units[batch], owner[batch], w, h), plane, w)
+        numpy.minimum.at(zkey, pix, numpy.clip((depth - dmin) / quantum, 0, 2**31).astype(numpy.int64) << 32 | prim)
+    solid = zkey != numpy.iinfo(numpy.int64).max
+    zbuf = numpy.where(solid, dmin + ((zkey >> 32) + 1) * quantum, numpy.inf)
+    image, transmit, layer, count = numpy.zeros((4, w * h)), numpy.ones(w * h), numpy.zeros((5, h, w + 1), numpy.float32), 0
+    translucent = numpy.flatnonzero(~opaque & (area > 0))
+    translucent = translucent[numpy.argsort(near[owner[translucent]], kind="stable")]
+    for batch in itertools.chain(batches(translucent, area, chunk), (None,)):
+        if batch is not None:
+            prim, y, start, length = spans(units[batch], owner[batch], w, h)
+            if solid.any():
+                prim, pix, depth = pixels(prim, y, start, length, plane, w)
+                prim, pix = prim[depth < zbuf[pix]], pix[depth < zbuf[pix]]
+                y, start, length = pix // w, pix % w, numpy.ones(len(pix), dtype=int)
+            a, m, count = colors[prim, 3], weight[prim], count + length.sum()
+            at = numpy.concatenate((y * (w + 1) + start, y * (w + 1) + start + length))
+            for c, value in enumerate((m * numpy.log1p(-a), m * a, *(m * a * colors[prim, :3].T))):
+                numpy.add.at(layer[c].reshape(-1), at, numpy.concatenate((value, -value)).astype(numpy.float32))
+        if batch is None and count or count >= slab * w * h:
+            fill = numpy.cumsum(layer[..., :w], axis=-1, out=layer[..., :w]).reshape(5, -1)
+            absorb = numpy.exp(fill[0])
+            image[:3] += transmit * (1 - absorb) / numpy.where(fill[1] > 2**-12, fill[1], numpy.inf) * fill[2:]
+            transmit *= absorb
+            layer[:], count = 0, 0
+    image[:3, solid] += transmit[solid] * colors[zkey[solid] & 0xffffffff, :3].T
+    image[3] = numpy.where(solid, 1, 1 - transmit)
+    image[:3] /= numpy.where(image[3] > 0, image[3], 1)
+    count = len(stage.dots) + len(stage.marks) + len(stage.rgb2d) + (stage.polys is not None) + (stage.lines is not None)
+    image = (image.T.reshape(h, w, 4) * 255).round().astype(numpy.uint8)
+    return image, numpy.subtract((x0, y0, x1, y1), extents), count
+
+
+def outlines(tris, colors, sizes):
+    import numpy, scipy.spatial
+    if sizes is None:
+        yield tris, colors, numpy.ones(len(tris))
+        return
+    first = numpy.cumsum(sizes) - sizes
+    flat = numpy.repeat(colors[first, 3] >= 1, sizes)
+    yield tris[flat], colors[flat], numpy.ones(flat.sum())
+    for size in numpy.unique(sizes[colors[first, 3] < 1]):
+        cells = first[(sizes == size) & (colors[first, 3] < 1)]
+        block = tris[cells[:, None] + numpy.arange(size)].reshape(len(cells), -1, 3)
+        rel = (block[..., :2] - block[:, :1, :2]).round(3)
+        index, inverse = distinct(rel.reshape(len(rel), -1))
+        for i, j in enumerate(index):
+            at = numpy.flatnonzero(inverse.ravel() == i)
+            outline = rel[j][scipy.spatial.ConvexHull(rel[j]).vertices]
+            p = numpy.zeros((len(at), len(outline), 3))
+            p[..., :2] = outline + block[at, :1, :2]
+            p[..., 2] = block[at, :, 2].min(axis=1)[:, None]
+            yield p, colors[cells[at]], numpy.full(len(at), 2)
+
+
+def trapezoids(p):
+    import numpy
+    edge = numpy.stack((p, numpy.roll(p, -1, axis=1)), axis=2)
+    edge = numpy.take_along_axis(edge, numpy.argsort(edge[..., 1], axis=2, kind="stable")[..., None], axis=2)
+    rise = edge[..., 1, 1] - edge[..., 0, 1]
+    slope = (edge[..., 1, 0] - edge[..., 0, 0]) / numpy.where(rise > 0, rise, 1)
+    ys, out = numpy.sort(p[..., 1], axis=1), numpy.zeros((len(p), p.shape[1] - 1, 8))
+    for i in range(p.shape[1] - 1):
+        mid = (ys[:, i, None] + ys[:, i+1, None]) / 2
+        hit = (edge[..., 0, 1] <= mid) & (mid < edge[..., 1, 1])
+        x = edge[..., 0, 0] + (mid - edge[..., 0, 1]) * slope
+        left = numpy.where(hit, x, numpy.inf).argmin(axis=1)[:, None]
+        right = numpy.where(hit, x, -numpy.inf).argmax(axis=1)[:, None]
+        out[:, i, 0], out[:, i, 1] = ys[:, i], numpy.where(hit.any(axis=1), ys[:, i+1], ys[:, i])
+        for k, e in ((2, left), (5, right)):
+            out[:, i, k:k+2] = numpy.take_along_axis(edge[..., 0, :2], e[..., None], axis=1)[:, 0]
+            out[:, i, k+2] = numpy.take_along_axis(slope, e, axis=1)[:, 0]
+    return out
+
+
+def planes(p):
+    import numpy
+    normal = numpy.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    ab = -normal[:, :2] / numpy.where(normal[:, 2:] == 0, numpy.nan, normal[:, 2:])
+    ab[(p[..., 2] == p[:, :1, 2]).all(axis=1)] = 0
+    return numpy.column_stack((ab, p[:, 0, 2] - (ab * p[:, 0, :2]).sum(axis=1)))
+
+
+def batches(units, area, chunk:int):
+    import numpy
+    ends = numpy.searchsorted(numpy.cumsum(area[units]), numpy.arange(chunk, area[units].sum() + chunk, chunk), "right")
+    for lo, hi in itertools.pairwise(numpy.unique(numpy.concatenate(([0], numpy.maximum(ends, 1), [len(units)])))):
+        yield units[lo:hi]
+
+
+def spans(units, owner, w:int, h:int):
+    import numpy
+    top = numpy.clip(numpy.ceil(units[:, 0] - 1/2), 0, h).astype(int)
+    rows = numpy.maximum(numpy.clip(numpy.ceil(units[:, 1] - 1/2), 0, h).astype(int) - top, 0)
+    unit = numpy.repeat(numpy.arange(len(rows)), rows)
+    y = top[unit] + numpy.arange(len(unit)) - numpy.repeat(numpy.cumsum(rows) - rows, rows)
+    s, yc = units[unit], (y + 1/2).astype(units.dtype)
+    round = numpy.isnan(s[:, 7])
+    chord = numpy.sqrt(numpy.maximum(s[:, 4]**2 - (yc - s[:, 3])**2, 0)) * round
+    left = numpy.where(round, s[:, 2] - chord, s[:, 2] + (yc - s[:, 3]) * s[:, 4])
+    right = numpy.where(round, s[:, 5] + chord, s[:, 5] + (yc - s[:, 6]) * s[:, 7])
+    start = numpy.clip(numpy.ceil(left - 1/2), 0, w).astype(int)
+    length = numpy.maximum(numpy.clip(numpy.ceil(right - 1/2), 0, w).astype(int) - start, 0)
+    return owner[unit], y, start, length
+
+
+def pixels(prim, y, start, length, plane, w:int):
+    import numpy
+    frag = numpy.repeat(numpy.arange(len(prim)), length)
+    x = start[frag] + numpy.arange(len(frag)) - numpy.repeat(numpy.cumsum(length) - length, length)
+    prim, y = prim[frag], y[frag]
+    return prim, y * w + x, plane[prim, 0] * (x + 1/2) + plane[prim, 1] * (y + 1/2) + plane[prim, 2]
+
+
+def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]=V[1], scale:tuple[int]=(1, 96),
+           title:bool|str=False, bars:bool=False, axes:bool=False, bg:bool=False, format:str|None=None,
+           workers:bool|int|None=None, backend:str|None=None, mesh:bool=False):
+    import matplotlib
+    "matplotlib.pyplot" in sys.modules or "MPLBACKEND" in os.environ or matplotlib.use("agg")
+    import matplotlib.pyplot, matplotlib.image, matplotlib.transforms, mpl_toolkits.mplot3d
+    scale = tuple(map(int, scale))
+    width = 96 * scale[0] / scale[1]
+    with timed("layout"):
+        fig, axs, mosaic, _, figrats, fs = layout(views, bars)
+    alpha = (3*math.log2(1+(len(shape.index) if isinstance(shape, shaped) else 1+len(shapes))))**-1
+    bbox_extra_artists = list()
+    with timed("analysis"):
+        summary = analysis(shape, *shapes, scale=scale)
+    with timed("staging"):
+        stage = staging(summary, fs=fs, alpha=alpha, hidden=occluded(shape, *shapes), mesh=mesh)
+    pool = panels = None
+    if fig and savefig and workers and len(views) > 1:
+        import concurrent.futures
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=None if workers is True else workers, initializer=warm)
+        panels = {
+            str(i): pool.submit(panel, i, stage, views=views, bars=bars, axes=axes, width=width)
+            for i in range(len(views))
+        } if backend != "raster" else dict()
+    elif backend == "raster":
+        panels = dict()
+    with timed("views"):
+        for i, ax in ((i, ax) for i, ax in axs.items() if i.isdigit()):
+            if panels is None:
+                draw(ax, stage)
+            elif stage.bounds is not None:
+                ax.auto_scale_xyz(*stage.bounds.T, had_data=False)
+            bbox_extra_artists.extend(frame(ax, int(i), views=views, fs=fs, width=width, axes=axes))
+            if backend == "raster":
+                job = (stage, projection(ax), ax.bbox.extents, fig.dpi)
+                panels[i] = pool.submit(raster, *job) if pool else raster(*job)
+    with timed("annotate"):
+        bbox_extra_artists.extend(annotate(
+            fig, axs, summary, scale, views, mosaic, figrats, fs, width, bars=bars, title=title, axes=axes,
+        ))
+    artists = sum(len(ax.collections) + len(ax.lines) for ax in axs.values())
+    with timed("panels"):
+        for i, future in (panels or dict()).items():
+            rgba, offsets, count = future.result() if pool else future
+            artists += count
+            rgba.size and axs[i].add_artist(matplotlib.image.BboxImage(
+                lambda renderer, ax=axs[i], offsets=offsets: matplotlib.transforms.Bbox.from_extents(ax.bbox.extents + offsets),
+                data=rgba, interpolation="nearest", zorder=2,
+            ))
+    pool and pool.shutdown()
+    tally("figure", artists=artists)
+    if fig and savefig:
+        metadata = {"Title": hasattr(title, "title") and title.title() or None,
+                    "Software": "https://github.com/infimalabs/space/",
+                    "Artist": "https://infima.space/",
+                    "Comment": f"{artists} artists"}
+        with timed("savefig"):
+            fig.savefig(bbox_extra_artists=bbox_extra_artists, bbox_inches="tight", transparent=not bg, pad_inches=0,
+                        fname=savefig, format=format, metadata=metadata)
+        isinstance(savefig, str) and os.path.isfile(savefig) and tally("savefig", bytes=os.path.getsize(savefig))
+
+
+def annotate(fig, axs:dict, summary:tuple, scale:tuple[int], views:tuple[tuple[int|float]], mosaic, figrats:tuple[float],
+             fs:float, width:float, bars:bool=False, title:bool|str=False, axes:bool=False):
+    import numpy, matplotlib
+    mathtex = collections.namedtuple("mathtex", "approx cdot mathbf epsilon frac dfrac delta Delta")
+    mtx = mathtex(*(fr"\{field}" for field in mathtex._fields))
+    colormap = matplotlib.colormaps["CMRmap"]
+    bbox_extra_artists = list()
+    for ax in (ax for i, ax in axs.items() if not i.isdigit()):
         ax.grid(False)
         ax.tick_params(pad=fs/8, labelsize=fs/2)
         ax.margins(*(0,)*len(ax._axis_names))
-        try:
-            i, view = int(i), views[int(i)]
-        except (ValueError, IndexError):
-            ax.set_xticklabels([])
-            ax.set_xlabel("")
-            ax.set_xticks([])
-            ax.set_ylabel("")
-            ax.set_yticks([])
-            continue
-        formatter = lambda value, xy: f"${value/width:.0f}$"
-        locator = matplotlib.ticker.MultipleLocator(base=width)
-        ax.xaxis.set_major_formatter(formatter)
-        ax.yaxis.set_major_formatter(formatter)
-        ax.zaxis.set_major_formatter(formatter)
-        ax.xaxis.set_major_locator(locator)
-        ax.yaxis.set_major_locator(locator)
-        ax.zaxis.set_major_locator(locator)
-        ax.xaxis.set_pane_color((0, 0, 0, 0))
-        ax.yaxis.set_pane_color((0, 0, 0, 0))
-        ax.zaxis.set_pane_color((0, 0, 0, 1/30))
-        ax.xaxis.line.set_color("r")
-        ax.yaxis.line.set_color("g")
-        ax.zaxis.line.set_color("b")
-        ax.set_proj_type("ortho")
-        ax.set_zorder(len(views)-i)
-        ax.set_box_aspect(aspect=(1, 1, 1))
-        ax.set_xlabel("$N_{X}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="r", clip_on=False)
-        ax.set_ylabel("$N_{Y}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="g", clip_on=False)
-        ax.set_zlabel("$N_{Z}$", fontweight="bold", labelpad=fs/2, fontsize=fs*0.75, color="b", clip_on=False)
-        bbox_extra_artists.extend((ax.xaxis.label, ax.yaxis.label, ax.zaxis.label))
-        if view[0] in (90, 270):
-            ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
-            ax.yaxis._axinfo['juggled'] = (2, 1, 0)
-            ax.set_zticklabels([])
-            ax.set_zlabel("")
-            ax.set_zticks([])
-        elif view[0] in (0, 180) and view[1] in (90, 270):
-            ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
-            ax.zaxis._axinfo['juggled'] = (1, 2, 0)
-            ax.set_yticklabels([])
-            ax.set_ylabel("")
-            ax.set_yticks([])
-        elif view[0] in (0, 180) and view[1] in (0, 180):
-            ax.set_box_aspect(aspect=(1, 1, 1), zoom=1+2**-2)
-            ax.set_xticklabels([])
-            ax.set_xlabel("")
-            ax.set_xticks([])
-        for axinfo in (ax.xaxis._axinfo, ax.yaxis._axinfo, ax.zaxis._axinfo):
-            axinfo["tick"]["inward_factor"], axinfo["tick"]["outward_factor"] = 0.0, 0.0
-        if rgb2d:
-            for (sz, rgb, _, _), line in rgb2d.items():
-                line = numpy.unique(line, axis=0)
-                marker = "^" if rgb == "B" else ">" if rgb == "R" else "<" if rgb == "G" else "none"
-                ax.plot(xs=line[:, 0], ys=line[:, 1], zs=line[:, 2], linewidth=sz/12, alpha=1/4,
-                        marker=marker, ms=sz/6, c=rgb.lower())
-        if axes:
-            golden = numpy.degrees(R["G06"])
-            bbox_extra_artists.append(ax.text2D(
-                x=1+2**-8, y=1-2**-5, transform=ax.transAxes, va="top",
-                ha="right", fontsize=fs*0.75, color="#1a1a1a",
-                s=r"$%s_{azim}\ %s_{elev}\ \mathbf{%s}$" % (
-                    r"\Phi-1" if view[1] == golden else fr"{view[1]}^\circ",
-                    r"\Phi-1" if view[0] == golden else fr"{view[0]}^\circ",
-                    ax.name if ax.name != "3d" else "ortho" if ax._focal_length == numpy.inf else "persp",
-                ),
-            ))
-        else:
-            ax.zaxis.set_pane_color((0, 0, 0, 0))
-            ax.xaxis.line.set_color("none")
-            ax.yaxis.line.set_color("none")
-            ax.zaxis.line.set_color("none")
-            ax.set_xticklabels([])
-            ax.set_xlabel("")
-            ax.set_xticks([])
-            ax.set_yticklabels([])
-            ax.set_ylabel("")
-            ax.set_yticks([])
-            ax.set_zticklabels([])
-            ax.set_zlabel("")
-            ax.set_zticks([])
-        xyzmm = max(map(abs, itertools.chain(ax.get_xlim(), ax.get_ylim(), ax.get_zlim())))
-        ax.set_xlim(-xyzmm, xyzmm)
-        ax.set_ylim(-xyzmm, xyzmm)
-        ax.set_zlim(-xyzmm, xyzmm)
-        ax.view_init(*view)
-    if len(base2) != 1 and 0 in base2 and len(base2[0]) == 1 and 0.0 in base2[0]:
-        origin = base2.pop(0).pop()
-        base2[min(base2)].add(origin)
-    base1max, base2max = max((0, *base1)), max((0, *base2))
-    base2rat = operator.truediv(*scale).as_integer_ratio()
-    base2min = max(int(math.log2(base2rat[1])), base1max)
-    base2set = {2**(base2max-b)*n for b in base2 for n in base2[b]}
-    base2gcd = 1 if len(base2set) == 1 else math.gcd(*base2set)
-    base2mm0 = base2rat[0] - base2gcd*2**(base2min-base2max)
+        ax.set_xticklabels([])
+        ax.set_xlabel("")
+        ax.set_xticks([])
+        ax.set_ylabel("")
+        ax.set_yticks([])
+    base1, base2, base1max, base2max, base2rat, base2min, base2gcd, base2mm0 = summary.epsilon
     if bars and base2:
         ax = axs["B"]
         ax.set_zorder(10)
@@ -452,7 +1386,7 @@ def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]
                 ]))])))),
             )
         stepc, counts, bins, gaps, hist = 4, [], [], [], numpy.histogram(
-            a=[k for k in sorted(base2) for _ in base2[k]],
+            a=numpy.repeat(sorted(base2), [len(base2[k]) for k in sorted(base2)]),
             bins=sorted({*base2, max(base2min, base2max)+1}),
         )
         for i, (c, b) in enumerate(itertools.zip_longest(*hist, fillvalue=0)):
@@ -499,25 +1433,17 @@ def figure(shape, *shapes, savefig:bool|str=False, views:tuple[tuple[int|float]]
             t="\n".join(list(filter(None, [
                 hasattr(title, "title") and title.title(),
                 r"$\mathbf{%s}_{\left(\epsilon_{\delta} = %s\right)}$" % (
-                    "integer" if base2rat[1] == 1 else
-                        "binary" if scale[0] == 1 and scale == base2rat else
-                        "stable" if scale == base2rat else
-                        "unstable",
+                    regime(scale, base2rat),
                     scale[0] if scale[1] == 1 else
                         fr"2^{{{-base2min}}} = \epsilon_{{N}}" if scale[0] == 1 and scale == base2rat else
                         fr"\frac{{{scale[0]}}}{{2^{{{base2min}}}}} = \epsilon_{{N}}" if scale == base2rat else
                         fr"\frac{{{scale[0]}}}{{{scale[1]}}} {mtx.approx} \frac{{{base2rat[0]}}}{{2^{{{base2min}}}}}"
                             fr"\right) > \left(\frac{{{nscale[0]}}}{{2^{{{math.log2(nscale[1]):.0f}}}}} = \epsilon_{{N}}",
                 ),
-            ] + [pretty(h) for h in sorted((h._replace(count=c) for h, c in supheaders.items()))] + [
+            ] + [pretty(h) for h in summary.supheaders] + [
             ]))),
         ))
-    if fig and savefig:
-        metadata = {"Title": hasattr(title, "title") and title.title() or None,
-                    "Software": "https://github.com/infimalabs/space/",
-                    "Artist": "https://infima.space/"}
-        fig.savefig(bbox_extra_artists=bbox_extra_artists, bbox_inches="tight", transparent=not bg, pad_inches=0,
-                    fname=savefig, metadata=metadata)
+    return bbox_extra_artists
 
 
 def mm2m(mm:float):
@@ -569,8 +1495,8 @@ def pretty(h):
 
 def configuration(*args, **kwds):
     make, args = (args[0], args[1:]) if args and callable(args[0]) else (configuration._make, args)
-    c = (auto, axes, bars, bg, centers, colormap, edges, faces, lines, n,
-     pop, rescale, savefig, scale, stix, title, verts, views) = make()(**kwds)
+    c = (auto, axes, backend, bars, bg, cache, centers, chunk, colormap, edges, faces, format, lines, mesh, n, opaque,
+     pop, profile, rescale, savefig, scale, scales, shell, stix, title, verts, views, workers) = make()(**kwds)
     colormap = "CMRmap" if colormap is None else colormap
     auto = False if auto is None else auto
     factor = random.randint(1, 4) if auto else 1
@@ -584,6 +1510,11 @@ def configuration(*args, **kwds):
     elif isinstance(scale, numbers.Real):
         scale = scale.as_integer_ratio()
     scale = (scale[0]//math.gcd(*scale), scale[1]//math.gcd(*scale))
+    scales = (
+        None if scales is None else
+        (1, scales, 96) if isinstance(scales, numbers.Integral) else
+        (*scales, 96)[:3]
+    )
     astype = float
     if rescale is None:
         astype = int
@@ -635,6 +1566,7 @@ def configuration(*args, **kwds):
     verts = auto and random.choice((True, False, not edges, not lines, not faces)) if verts is None else verts
     stix = auto and random.choice((True, False, edges, not lines, not faces, verts)) if stix is None else stix
     bg = auto and True if bg is None else bg
+    opaque = False if opaque is None else opaque
     ns, configs = locals().copy(), list()
     ks = {k for k in kwds if ns[k] is not None}
     for k in args:
@@ -649,8 +1581,9 @@ def configuration(*args, **kwds):
     return (*configs, konfig) if configs else konfig
 
 configuration._field_defaults = dict.fromkeys((*sorted((
-    "auto", "axes", "bars", "bg", "centers", "colormap", "edges", "faces", "lines", "n",
-    "pop", "rescale", "savefig", "scale", "stix", "title", "verts", "views",
+    "auto", "axes", "backend", "bars", "bg", "cache", "centers", "chunk", "colormap", "edges", "faces", "format", "lines",
+    "mesh", "n", "opaque", "pop", "profile", "rescale", "savefig", "scale", "scales", "shell", "stix", "title", "verts", "views",
+    "workers",
 )),))
 
 configuration._fields = (*sorted(configuration._field_defaults),)
@@ -726,10 +1659,802 @@ def flags(name, *args, **kwds):
     )
 
 
-def interactive(*args, **kwds):
-    figure(*args, **kwds)
+def reporting(e:epsilon, scale:tuple[int], floats:int|None=None, epsilons:int|None=None):
+    delta = fractions.Fraction(e.base2rat[0], 2**e.base2min)
+    normal = fractions.Fraction(e.base2gcd, 2**e.base2max)
+    return dict(
+        scale=f"{scale[0]}/{scale[1]}",
+        regime=regime(scale, e.base2rat),
+        epsilon_delta=str(delta),
+        epsilon_N=str(normal),
+        epsilon_Delta=str(delta - normal),
+        floats=sum(map(len, e.base2.values())) if floats is None else floats,
+        epsilons=len(e.base2) if epsilons is None else epsilons,
+    )
+
+
+def stats(shape, *shapes, scale:tuple[int]=(1, 96), format:str|None=None, **kwds):
+    scale = tuple(map(int, scale))
+    with timed("analysis"):
+        summary = analysis(shape, *shapes, scale=scale)
+    e = summary.epsilon
+    report = dict(
+        **reporting(e, scale),
+        powers={p: len(e.base2[p]) for p in sorted(e.base2)},
+        shapes=[
+            dict(count=h.count, vertices=h.vertices, volume=h.volume, edges=h.edges, scale=f"{h.scale[0]}/{h.scale[1]}",
+                 desc=pretty(h))
+            for h in summary.supheaders
+        ],
+    )
+    if format == "json":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    for k, v in report.items():
+        if k == "shapes":
+            sys.stdout.writelines(f"{k}: {v['count']} {v['desc']}\n" for v in v)
+        elif k == "powers":
+            sys.stdout.writelines(f"{k}: 2^-{p} {n}\n" for p, n in v.items())
+        else:
+            sys.stdout.write(f"{k}: {v}\n")
+
+
+def sweep(shape, *shapes, scales:tuple[int]|None=None, format:str|None=None, chunk:int=2**22, **kwds):
+    import numpy
+    lo, hi, den = map(int, scales or (1, 2**12, 96))
+    idents, coords = coordinates(shape, *shapes)
+    base1max = max((0, *binary(idents)))
+    k = numpy.arange(lo, hi + 1, dtype=numpy.int64)
+    num, den = k // numpy.gcd(k, den), den // numpy.gcd(k, den)
+    report, rows = list(), max(1, chunk // max(1, len(coords)))
+    for start in range(0, len(k), rows):
+        s0, s1 = num[start:start+rows], den[start:start+rows]
+        a = coords * s0[:, None] / s1[:, None]
+        valid = numpy.ones(a.shape, dtype=bool)
+        valid[:, 1:] = a[:, 1:] != a[:, :-1]
+        m, e = numpy.frexp(a)
+        n = numpy.ldexp(m, 53).astype(numpy.int64)
+        tz = numpy.frexp(n & -n)[1] - 1
+        power = numpy.where(n == 0, 0, 53 - e - tz)
+        odd = numpy.where(valid, n >> numpy.maximum(tz, 0), 0)
+        keys = numpy.where(valid, numpy.maximum(power, 0), -1)
+        keys.sort(axis=1)
+        keys = (numpy.diff(keys, axis=1, prepend=-1) != 0).sum(axis=1)
+        origin = (a[:, :1] == 0).any(axis=1) & ~(valid & (a != 0) & (power <= 0)).any(axis=1) & (keys != 1)
+        tops = numpy.where(valid & (a != 0), power, -2**30).max(axis=1, initial=-2**30)
+        for scale, floats, epsilons, base2max, top, base2gcd in zip(
+            zip(s0.tolist(), s1.tolist()), valid.sum(axis=1).tolist(), (keys - origin).tolist(),
+            numpy.where(valid, power, 0).max(axis=1, initial=0).tolist(), tops.tolist(), numpy.gcd.reduce(odd, axis=1).tolist(),
+        ):
+            base2rat = operator.truediv(*scale).as_integer_ratio()
+            base2min = max(int(math.log2(base2rat[1])), base1max)
+            base2gcd = 1 if floats == 1 else base2gcd << (base2max - top) if base2gcd else 0
+            e = epsilon(None, None, base1max, base2max, base2rat, base2min, base2gcd, None)
+            report.append(reporting(e, scale, floats=floats, epsilons=epsilons))
+    tally("sweep", scales=len(report), floats=len(coords))
+    if format == "json":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    head = (*report[0],) if report else ()
+    table = [head, *((*map(str, r.values()),) for r in report)]
+    widths = [max(map(len, col)) for col in zip(*table)]
+    sys.stdout.writelines("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip() + "\n" for r in table)
+
+
+def coordinates(shape, *shapes, factor:int|float=1):
+    import numpy
+    if isinstance(shape, shaped):
+        groups = (
+            (shape.prototypes[i] + shape.translations[(shape.index == i) & (shape.config == k), None], shape.configs[k])
+            for i, k in numpy.unique(numpy.column_stack((shape.index, shape.config)), axis=0).tolist()
+        )
+    else:
+        groups = expand(shape, *shapes)
+    idents, coords = [numpy.empty(0)], [numpy.empty(0)]
+    for ident, c in groups:
+        rescale = c.rescale[0] * factor, c.rescale[1]
+        idents.append(numpy.unique(numpy.abs(ident)))
+        if rescale[1] == 1 and (isinstance(rescale[0], numbers.Integral) or rescale[0].is_integer()):
+            coords.append(numpy.unique(numpy.abs(ident * rescale[0])))
+    return numpy.unique(numpy.concatenate(idents)), numpy.unique(numpy.concatenate(coords))
+
+
+def export(shape, *shapes, scale:tuple[int]=(1, 96), savefig:bool|str=False, format:str|None=None, chunk:int=2**14,
+           **kwds):
+    import numpy, tempfile, shutil, zipfile
+    scale, chunk = tuple(map(int, scale)), int(chunk)
+    savefig = "/".join(p or "" for p in savefig) if isinstance(savefig, tuple) else savefig or "savefig.png"
+    root, ext = os.path.splitext(savefig)
+    format = format or (ext[1:] if ext in (".ply", ".npz") else "ply")
+    if format not in ("ply", "npz"):
+        raise ValueError(f"unknown export format {format!r}")
+    path = f"{root}.{format}"
+    if isinstance(shape, shaped):
+        configs, idents = shape.configs, shape.prototypes
+        reach = max((abs(p).max(initial=0) for p in idents), default=0) + abs(shape.translations).max(initial=0)
+    else:
+        configs, idents = [c for _, c in (shape, *shapes)], [ident for ident, _ in (shape, *shapes)]
+        reach = max((abs(ident).max(initial=0) for ident in idents), default=0)
+    exact = all(c.rescale[1] == 1 and float(c.rescale[0]).is_integer() for c in configs)
+    exact = exact and all((numpy.mod(ident, 1) == 0).all() for ident in idents)
+    reach *= max((c.rescale[0] for c in configs), default=1)
+    dtype = numpy.dtype("<f8" if not exact else "<i4" if reach < 2**31 else "<i8")
+    ply = numpy.dtype("<i4" if dtype == "<i4" else "<f8")
+    if isinstance(shape, shaped):
+        lows = numpy.array([p[:, 0].min(initial=0) for p in shape.prototypes])[shape.index] + shape.translations[:, 0]
+        lows = lows * numpy.array([c.rescale[0] / c.rescale[1] for c in shape.configs])[shape.config]
+        cell = lambda k: (shape.prototypes[shape.index[k]] + shape.translations[k], shape.configs[shape.config[k]])
+    else:
+        cell = (shape, *shapes).__getitem__
+        lows = numpy.array([ident[:, 0].min(initial=0) * c.rescale[0] / c.rescale[1] for ident, c in (shape, *shapes)])
+    order = numpy.argsort(lows, kind="stable")
+    lows = lows[order] * (1 if exact else scale[0] / scale[1])
+    lows = numpy.append(lows - abs(lows) * 2**-32, math.inf)
+    hulls, counts, carry, ids = dict(), [0, 0, 0], numpy.empty((0, 3), dtype=dtype), numpy.empty(0, dtype=numpy.int64)
+    with contextlib.ExitStack() as stack:
+        vf, xf, of, cf = (stack.enter_context(tempfile.TemporaryFile()) for _ in range(4))
+        of.write(numpy.zeros(1, "<i8").tobytes())
+        for start in range(0, len(order), chunk):
+            verts, faces, sizes, owner, base = [carry], list(), list(), list(), len(carry)
+            for k in order[start:start+chunk].tolist():
+                ident, c = cell(k)
+                if len(ident) < 4:
+                    continue
+                key = ((ident - ident.mean(axis=0)).round(6) + 0.0).tobytes()
+                flat, size = hulls[key] if key in hulls else hulls.setdefault(key, loops(ident))
+                verts.append(ident * c.rescale[0] if exact else ident * c.rescale[0] * scale[0] / c.rescale[1] / scale[1])
+                faces.append(flat + base)
+                sizes.append(size)
+                owner.append(numpy.full(len(size), k))
+                base += len(ident)
+            if not faces:
+                continue
+            verts, faces, sizes, owner = map(numpy.concatenate, (verts, faces, sizes, owner))
+            first, inverse = distinct(verts)
+            used, old = numpy.zeros(len(first), dtype=bool), first < len(carry)
+            used[inverse[faces]] = True
+            index = numpy.empty(len(first), dtype=numpy.int64)
+            index[old] = ids[first[old]]
+            index[used & ~old] = counts[0] + numpy.arange((used & ~old).sum())
+            faces, bound = index[inverse[faces]], lows[min(start + chunk, len(order))]
+            live = (used | old) & (verts[first, 0] >= bound)
+            carry, ids, first = verts[first[live]], index[live], first[used & ~old]
+            vf.write(verts[first].astype(ply if format == "ply" else dtype).tobytes())
+            if format == "ply":
+                ends = numpy.cumsum(sizes)
+                for n in numpy.unique(sizes):
+                    at = numpy.flatnonzero(sizes == n)
+                    record = numpy.zeros(len(at), [("n", "u1"), ("v", "<i4", (n,)), ("cell", "<i4")])
+                    record["n"], record["cell"] = n, owner[at]
+                    record["v"] = faces[(ends[at] - n)[:, None] + numpy.arange(n)]
+                    xf.write(record.tobytes())
+            else:
+                xf.write(faces.astype("<i8").tobytes())
+                of.write((numpy.cumsum(sizes) + counts[2]).astype("<i8").tobytes())
+                cf.write(owner.astype("<i8").tobytes())
+            counts = [counts[0] + len(first), counts[1] + len(sizes), counts[2] + len(faces)]
+        for f in (vf, xf, of, cf):
+            f.seek(0)
+        if format == "ply":
+            with open(path, "wb") as f:
+                f.write("\n".join((
+                    "ply", "format binary_little_endian 1.0", "comment A15.py indexed mesh",
+                    f"comment scale {scale[0]}/{scale[1]}" if exact else "comment scale 1/1",
+                    f"element vertex {counts[0]}", *(f"property {'int' if ply == '<i4' else 'double'} {x}" for x in "xyz"),
+                    f"element face {counts[1]}", "property list uchar int vertex_indices", "property int cell",
+                    "end_header", "",
+                )).encode())
+                shutil.copyfileobj(vf, f)
+                shutil.copyfileobj(xf, f)
+        else:
+            with zipfile.ZipFile(path, "w", allowZip64=True) as z:
+                for name, f, descr, dims in (
+                    ("vertices", vf, dtype.str, (counts[0], 3)),
+                    ("faces", xf, "<i8", (counts[2],)),
+                    ("offsets", of, "<i8", (counts[1] + 1,)),
+                    ("cells", cf, "<i8", (counts[1],)),
+                ):
+                    with z.open(f"{name}.npy", "w", force_zip64=True) as out:
+                        numpy.lib.format.write_array_header_1_0(out, dict(descr=descr, fortran_order=False, shape=dims))
+                        shutil.copyfileobj(f, out)
+                with z.open("scale.npy", "w") as out:
+                    numpy.lib.format.write_array(out, numpy.array(scale if exact else (1, 1), dtype="<i8"))
+    tally("export", vertices=counts[0], faces=counts[1], bytes=os.path.getsize(path))
+    sys.stdout.write(f"{path}\n")
+
+
+def loops(ident):
+    import numpy, scipy.spatial
+    hull = scipy.spatial.ConvexHull(ident)
+    _, facet = numpy.unique(hull.equations.round(6) + 0.0, axis=0, return_inverse=True)
+    flat, sizes = list(), list()
+    for f in range(facet.max() + 1):
+        at = numpy.unique(hull.simplices[facet.ravel() == f])
+        rel = ident[at] - ident[at].mean(axis=0)
+        u = rel[0] / numpy.linalg.norm(rel[0])
+        w = numpy.cross(hull.equations[facet.ravel() == f][0, :3], u)
+        flat.append(at[numpy.argsort(numpy.arctan2(rel @ w, rel @ u))])
+        sizes.append(len(at))
+    return numpy.concatenate(flat), numpy.array(sizes)
+
+
+def batch(*paths, workers:int|None=None, savefig:str|tuple|None=None, **kwds):
+    import concurrent.futures
+    savefig = "/".join(p or "" for p in savefig) if isinstance(savefig, tuple) else savefig
+    savefig and os.makedirs(savefig, exist_ok=True)
+    paths = [
+        os.path.join(path, name) if os.path.isdir(path) else path
+        for path in paths
+        for name in (sorted(n for n in os.listdir(path) if n.endswith(".txt")) if os.path.isdir(path) else (None,))
+    ]
+    jobs = {
+        os.path.abspath(path): os.path.join(savefig or os.path.dirname(path), os.path.basename(path).removesuffix(".txt"))
+        for path in paths
+    }
+    status = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=warm) as pool:
+        futures = {pool.submit(render, path, out, **kwds): out for path, out in jobs.items()}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                status = 1
+                traceback.print_exception(e)
+            else:
+                sys.stdout.write(f"{futures[future]}\n")
+    return status
+
+
+def stream(*paths, scale:tuple[int]=(1, 96), stix:bool=False, varint:bool=False, chunk:int=2**20,
+           workers:bool|int|None=None, savefig:str|tuple|None=None, **kwds):
+    import numpy, concurrent.futures
+    scale, chunk = tuple(map(int, scale)), int(chunk)
+    savefig = "/".join(p or "" for p in savefig) if isinstance(savefig, tuple) else savefig
+    savefig and os.makedirs(savefig, exist_ok=True)
+    workers = os.cpu_count() if workers is True else workers
+    pool = workers and concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    status, targets = 0, list()
+    for path in paths:
+        magic = b""
+        with contextlib.suppress(OSError), open(path, "rb") as f:
+            magic = f.read(6)
+        targets.append((path, magic))
+    outs = [
+        os.path.join(savefig or os.path.dirname(path), os.path.splitext(os.path.basename(path))[0] + (
+            ".npy" if magic.startswith(b"A15i") else ".a15"
+        ))
+        for path, magic in targets
+    ]
+    clashes = collections.Counter(map(os.path.abspath, outs))
+    for (path, magic), out in zip(targets, outs):
+        try:
+            if clashes[os.path.abspath(out)] > 1:
+                raise ValueError(f"{out} is the output of {clashes[os.path.abspath(out)]} inputs")
+            if os.path.lexists(out):
+                raise FileExistsError(f"{out} already exists (stream never overwrites)")
+            if magic.startswith(b"A15i"):
+                p = unpack(path, chunk=chunk)
+                with open(out, "xb") as f:
+                    numpy.lib.format.write_array_header_1_0(f, dict(descr="<f8", fortran_order=False, shape=(p.count, 3)))
+                    for ids in p.ids:
+                        decode(ids, p.scale).astype("<f8").tofile(f)
+            else:
+                if magic == b"\x93NUMPY":
+                    points = numpy.load(path, mmap_mode="r")
+                    if points.ndim != 2 or points.shape[1] != 3 or not points.flags.c_contiguous:
+                        raise ValueError(f"{path} is not a C-ordered (n, 3) array")
+                    dtype, offset, count = points.dtype.str, points.offset, len(points)
+                    del points
+                else:
+                    dtype, offset, count = "<f8", 0, os.path.getsize(path) // 24
+                jobs = ((path, dtype, offset, lo, min(lo + chunk, count), scale, stix) for lo in range(0, count, chunk))
+                pack(out, ordered(pool, quantize, jobs, 2 * workers) if pool else itertools.starmap(quantize, jobs),
+                     scale=scale, stix=stix, varint=varint)
+        except Exception as e:
+            status = 1
+            traceback.print_exception(e)
+        else:
+            tally("stream", files=1, bytes=os.path.getsize(out))
+            sys.stdout.write(f"{out}\n")
+    pool and pool.shutdown()
+    return status
+
+
+def ordered(pool, fn, jobs, window:int):
+    pending = collections.deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, *job))
+        if len(pending) > window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def quantize(path:str, dtype:str, offset:int, lo:int, hi:int, scale:tuple[int], stix:bool):
+    import numpy
+    itemsize = 3 * numpy.dtype(dtype).itemsize
+    points = numpy.memmap(path, dtype=dtype, mode="r", offset=offset + lo * itemsize, shape=(hi - lo, 3))
+    e = encode(points, scale, stix=stix)
+    del points
+    r = numpy.abs(e.residuals).max(axis=-1) if stix else (e.residuals * e.residuals).sum(axis=-1)
+    worst = r.argmax(keepdims=True) if len(r) else []
+    return encoded(ids=e.ids, residuals=e.residuals[worst])
+
+
+def warm():
+    import io, numpy, scipy.spatial, matplotlib
+    matplotlib.use("agg")
+    import matplotlib.pyplot, matplotlib.ticker, mpl_toolkits.mplot3d
+    fig = matplotlib.pyplot.figure()
+    fig.add_subplot(projection="3d").set_title(r"$\mathbf{\epsilon_{\Delta}} = \frac{1}{2^{7}} \approx 2^{-7}$")
+    fig.savefig(io.BytesIO(), format="png")
+    matplotlib.pyplot.close(fig)
+
+
+def render(path, savefig, **kwds):
+    import matplotlib.pyplot
+    random.seed(os.path.basename(path))
+    try:
+        main(path, savefig=savefig, **kwds)
+    finally:
+        matplotlib.pyplot.close("all")
+    return savefig
+
+
+def endpoint():
+    import tempfile
+    return os.environ.get("A15_SERVE") or os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), "A15.sock")
+
+
+def serve(path:str|None=None, *, workers:bool|int|None=None, **kwds):
+    import signal, socket, concurrent.futures
+    path, started = path or endpoint(), os.stat(__file__).st_mtime_ns
+    workers = os.cpu_count() if workers in (None, True) else workers
+    with socket.socket(socket.AF_UNIX) as probe, contextlib.suppress(OSError):
+        probe.connect(path)
+        raise RuntimeError(f"already serving on {path}")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    umask = os.umask(0o177)
+    try:
+        server = socket.socket(socket.AF_UNIX)
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    sys.stdout.write(f"{path}\n")
+    sys.stdout.flush()
+    try:
+        with server, concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=warm) as pool:
+            concurrent.futures.wait([pool.submit(int) for _ in range(workers)])
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            server.listen(2 * workers)
+            while True:
+                conn, _ = server.accept()
+                try:
+                    conn.settimeout(10)
+                    request = json.loads(conn.makefile("rb").readline())
+                    args, cwd, env = request["args"], request["cwd"], request["env"]
+                    stdin, body = request.get("stdin"), request.get("body", False)
+                    conn.settimeout(None)
+                except (OSError, ValueError, KeyError, TypeError):
+                    conn.close()
+                    continue
+                if os.stat(__file__).st_mtime_ns != started:
+                    replied(conn, None)
+                    continue
+                future = pool.submit(served, args, cwd, env, stdin=stdin, body=body, **kwds)
+                future.add_done_callback(functools.partial(replied, conn))
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def served(args, cwd, env, stdin=None, body=False, **kwds):
+    import io, matplotlib.pyplot
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    random.seed()
+    savefig = os.path.abspath(os.environ.get("SAVEFIG", "savefig.png"))
+    before = os.stat(savefig).st_mtime_ns if os.path.isfile(savefig) else None
+    out, err, sys.stdin = io.StringIO(), io.StringIO(), io.StringIO(stdin or "")
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            status = main(*args, **kwds)
+        except:
+            status = help() or 1
+        finally:
+            matplotlib.pyplot.close("all")
+    saved = os.path.isfile(savefig) and os.stat(savefig).st_mtime_ns != before
+    data = open(savefig, "rb").read() if saved and body else b""
+    return dict(status=status, stdout=out.getvalue(), stderr=err.getvalue(), savefig=saved and savefig or None,
+                size=len(data)), data
+
+
+def replied(conn, future):
+    with conn:
+        try:
+            head, data = future.result() if future else (dict(stale=True), b"")
+        except Exception as e:
+            head, data = dict(status=1, stdout="", stderr="".join(traceback.format_exception(e)), savefig=None, size=0), b""
+        with contextlib.suppress(OSError):
+            conn.sendall(json.dumps(head).encode() + b"\n" + data)
+
+
+def forward(*args):
+    import io, socket
+    tool = args[0].partition(":")[0] if args and args[0][:1] not in ("-", ":", ".", "/") else ""
+    if tool in ("batch", "stream", "serve") or tool and "interactive".startswith(tool):
+        return main(*args)
+    stdin = sys.stdin.read() if {"-", "/dev/stdin"} & {*args} else None
+    sys.stdin = sys.stdin if stdin is None else io.StringIO(stdin)
+    request = dict(args=args, cwd=os.getcwd(), env=dict(os.environ), stdin=stdin)
+    try:
+        with socket.socket(socket.AF_UNIX) as conn:
+            conn.connect(endpoint())
+            conn.sendall(json.dumps(request).encode() + b"\n")
+            conn.shutdown(socket.SHUT_WR)
+            head = json.loads(conn.makefile("rb").readline())
+    except (OSError, ValueError):
+        head = dict(stale=True)
+    if head.get("stale"):
+        return main(*args)
+    sys.stdout.write(head["stdout"])
+    sys.stderr.write(head["stderr"])
+    return head["status"]
+
+
+def cached(fn, *args, limit:bool|int|None=None, savefig:bool|str=False, **kwds):
+    import io, hashlib, inspect, importlib.metadata
+    root = os.environ.get("A15_CACHE") or os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "A15")
+    keyed = sorted((k, v) for k, v in kwds.items() if k in inspect.signature(fn).parameters)
+    if savefig and "savefig" in inspect.signature(fn).parameters:
+        keyed.append(("savefig", kwds.get("format") or os.path.splitext(savefig)[1][1:].lower() or "png"))
+    digest = hashlib.sha256(repr((fn.__name__, fingerprint(fn), keyed, sys.version_info[:2])).encode())
+    digest.update(repr([importlib.metadata.version(dist) for dist in ("numpy", "scipy", "matplotlib")]).encode())
+    for shape in args:
+        arrays = (*shape.prototypes, shape.translations, shape.index, shape.config) if isinstance(shape, shaped) else shape[:1]
+        for a in arrays:
+            digest.update(repr((a.dtype.str, a.shape)).encode())
+            digest.update(a.tobytes())
+        configs = shape.configs if isinstance(shape, shaped) else shape[1:]
+        digest.update(repr([c._replace(savefig=None) if "savefig" in c._fields else c for c in configs]).encode())
+    path = os.path.join(root, digest.hexdigest())
+    try:
+        with open(path, "rb") as f:
+            head, body = json.loads(f.readline()), f.read()
+    except (OSError, ValueError):
+        pass
+    else:
+        os.utime(path)
+        sys.stdout.write(head["stdout"])
+        if head["saved"] and savefig:
+            with open(f"{savefig}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{savefig}.tmp", savefig)
+        tally("cache", hits=1)
+        return
+    before = os.stat(savefig).st_mtime_ns if savefig and os.path.isfile(savefig) else None
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            fn(*args, savefig=savefig, **kwds)
+    finally:
+        sys.stdout.write(out.getvalue())
+    saved = bool(savefig) and os.path.isfile(savefig) and os.stat(savefig).st_mtime_ns != before
+    os.makedirs(root, exist_ok=True)
+    with open(f"{path}.{os.getpid()}", "wb") as f:
+        f.write(json.dumps(dict(stdout=out.getvalue(), saved=saved)).encode() + b"\n")
+        if saved:
+            with open(savefig, "rb") as g:
+                f.write(g.read())
+    os.replace(f"{path}.{os.getpid()}", path)
+    tally("cache", misses=1, bytes=os.path.getsize(path))
+    entries = sorted((e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in os.scandir(root) if "." not in e.name)
+    total = sum(size for _, size, _ in entries)
+    for _, size, stale in entries:
+        if total <= (256 if limit in (None, True) else limit) * 2**20 or stale == path:
+            break
+        with contextlib.suppress(OSError):
+            os.remove(stale)
+            total -= size
+
+
+def fingerprint(fn, *, cache=dict()):
+    import hashlib, inspect
+    if fn.__name__ not in cache:
+        digest, seen, todo = hashlib.sha256(), set(), [fn.__name__]
+        while todo:
+            name = todo.pop()
+            obj = globals().get(name)
+            if name in seen or obj is None or getattr(obj, "__module__", __name__) != __name__:
+                continue
+            seen.add(name)
+            if not hasattr(obj, "__code__"):
+                digest.update(repr(getattr(obj, "_fields", obj) if name.isupper() or hasattr(obj, "_fields") else name).encode())
+                continue
+            digest.update(inspect.getsource(obj).encode())
+            codes = [inspect.unwrap(obj).__code__]
+            while codes:
+                code = codes.pop()
+                todo.extend(sorted(code.co_names))
+                codes.extend(c for c in code.co_consts if hasattr(c, "co_names"))
+        cache[fn.__name__] = digest.hexdigest()
+    return cache[fn.__name__]
+
+
+def interactive(shape, *shapes, views:tuple[tuple[int|float]]=V[1], scale:tuple[int]=(1, 96), axes:bool=False,
+                bars:bool=False, title:bool|str=False, mesh:bool=False, chunk:int=2**12, **kwds):
+    import numpy, matplotlib, matplotlib.pyplot, matplotlib.widgets
+    if isinstance(shape, shaped):
+        shape = layered(reach=float(numpy.abs(shape.translations).max(initial=0)) / 48, bands=iter(((math.inf, shape),)))
+    if not isinstance(shape, layered) or not views:
+        shape = gather(*(block for _, block in shape.bands)) if isinstance(shape, layered) else shape
+        figure(shape, *shapes, **dict(kwds, views=views, scale=scale, axes=axes, bars=bars, title=title, mesh=mesh,
+                                      workers=None, backend=None))
+        with matplotlib.pyplot.ion():
+            matplotlib.pyplot.show(block=True)
+        return
+    scale = tuple(map(int, scale))
+    fig, axs, mosaic, _, figrats, fs = layout(views, bars)
+    fig.set_dpi(matplotlib.rcParams["figure.dpi"])
+    fig.subplots_adjust(bottom=2**-3)
+    live = dict(
+        fig=fig, axs=axs, bands=shape.bands, top=shape.reach, loaded=-1, shape=gather(), prototypes=dict(), configs=dict(),
+        reach=numpy.empty(0), extent=numpy.empty(0), fs=fs, width=96 * scale[0] / scale[1], alpha=None, axes=axes, mesh=mesh,
+        chunk=int(chunk), views=views, mosaic=mosaic, figrats=figrats, bars=bars, title=title, headers=dict(), zoom=None,
+        scale=scale, base=scale, factor=0, n=math.inf, target=0, drawn=list(), timer=fig.canvas.new_timer(interval=1),
+    )
+    for i, ax in ((i, ax) for i, ax in axs.items() if i.isdigit()):
+        ax.auto_scale_xyz([-1, 1], [-1, 1], [-1, 1], had_data=False)
+        frame(ax, int(i), views=views, fs=fs, width=live["width"], axes=axes)
+    n = max(shape.reach, 1)
+    boxes = [fig.add_axes(box, zorder=len(views)+11)
+             for box in ((0.2, 0.08, 0.6, 0.02), (0.2, 0.05, 0.6, 0.02), (0.2, 0.015, 0.2, 0.025))]
+    controls = live["controls"] = (
+        matplotlib.widgets.Slider(boxes[0], "n", 0, n, valinit=n),
+        matplotlib.widgets.Slider(boxes[1], "rescale", -4, 4, valinit=0, valstep=1, valfmt="2^%d"),
+        matplotlib.widgets.TextBox(boxes[2], "scale", initial=f"{scale[0]}/{scale[1]}"),
+    )
+    controls[0].on_changed(lambda n: steer(live, n=n))
+    controls[1].on_changed(lambda factor: steer(live, factor=factor))
+    controls[2].on_submit(lambda text: steer(live, text=text))
+    live["timer"].add_callback(progressive, live)
+    steer(live, n=n)
     with matplotlib.pyplot.ion():
         matplotlib.pyplot.show(block=True)
+    return live, controls
+
+
+def advance(live:dict):
+    import numpy
+    try:
+        live["loaded"], block = next(live["bands"])
+    except StopIteration:
+        live["loaded"], block = math.inf, gather()
+    prototypes, configs, store, s = live["prototypes"], live["configs"], live["shape"], live["base"]
+    pi = numpy.array([prototypes.setdefault((p.shape, p.tobytes()), (len(prototypes), p))[0] for p in block.prototypes])
+    ci = numpy.array([configs.setdefault((c._fields, c), (len(configs), c))[0] for c in block.configs])
+    reach = numpy.abs(block.translations).max(axis=-1, initial=0)
+    order = numpy.argsort(reach, kind="stable")
+    rescale = numpy.array([operator.truediv(*c.rescale) for c in block.configs])[block.config] * s[0] / s[1]
+    bounds = numpy.array([numpy.abs(p).max(initial=0) for p in block.prototypes])[block.index]
+    live["shape"] = shaped(
+        prototypes=(*(p for _, p in prototypes.values()),),
+        translations=numpy.concatenate((store.translations, block.translations[order])),
+        index=numpy.concatenate((store.index, pi[block.index[order]].astype(numpy.int32))),
+        config=numpy.concatenate((store.config, ci[block.config[order]].astype(numpy.int32))),
+        configs=(*(c for _, c in configs.values()),),
+    )
+    live["reach"] = numpy.concatenate((live["reach"], reach[order] / 48))
+    live["extent"] = numpy.maximum.accumulate(numpy.concatenate((live["extent"], ((bounds + reach) * rescale)[order])))
+    if live["alpha"] is None and len(order):
+        count = len(live["reach"]) * max(1, (live["top"] + 1) / (live["loaded"] + 1))**3
+        live["alpha"] = (3*math.log2(1+count))**-1
+    slider = live["controls"][0]
+    if live["loaded"] == math.inf and max(live["reach"][-1:], default=0) > slider.valmax:
+        slider.valmax = live["reach"][-1]
+        slider.ax.set_xlim(slider.valmin, slider.valmax)
+        live["n"] == math.inf and slider.set_val(slider.valmax)
+
+
+def progressive(live:dict):
+    import numpy
+    drawn = live["drawn"]
+    target = live["target"] = int(numpy.searchsorted(live["reach"], live["n"], "right"))
+    while drawn and drawn[-1][1] > target:
+        lo, hi, artists, stage, _ = drawn.pop()
+        for artist in artists:
+            artist.remove()
+        if lo < target and stage.owners is not None:
+            stage = trimmed(stage, target - lo)
+            drawn.append((lo, target, overlay(live["axs"], stage), stage, None))
+    stale = next((i for i, (*_, measured) in enumerate(drawn) if measured is None), None)
+    if stale is not None:
+        lo, hi, artists, stage, _ = drawn[stale]
+        drawn[stale] = lo, hi, artists, stage, measure(live, lo, hi)
+        banner(live)
+        live["fig"].canvas.draw_idle()
+        return
+    lo = drawn[-1][1] if drawn else 0
+    size = min(live["chunk"], max(2**6, lo))
+    while len(live["reach"]) < lo + size and live["loaded"] < live["n"]:
+        advance(live)
+    target = live["target"] = int(numpy.searchsorted(live["reach"], live["n"], "right"))
+    zoom(live)
+    if lo >= target:
+        live["timer"].stop()
+        banner(live)
+        live["fig"].canvas.draw_idle()
+        return
+    hi = min(target, lo + size)
+    with timed("batch"):
+        block = live["shape"]._replace(
+            translations=live["shape"].translations[lo:hi],
+            index=live["shape"].index[lo:hi],
+            config=live["shape"].config[lo:hi],
+        )
+        summary = analysis(block, scale=live["base"])
+        stage = staging(summary, fs=live["fs"], alpha=live["alpha"], hidden=occluded(block), mesh=live["mesh"])
+        drawn.append((lo, hi, overlay(live["axs"], stage), stage, measure(live, lo, hi)))
+    tally("batch", cells=hi-lo)
+    banner(live)
+    live["fig"].canvas.draw_idle()
+
+
+def overlay(axs:dict, stage:tuple):
+    artists = list()
+    for ax in (ax for i, ax in axs.items() if i.isdigit()):
+        before = {*map(id, ax.collections), *map(id, ax.lines)}
+        draw(ax, stage)
+        artists.extend(a for a in (*ax.collections, *ax.lines) if id(a) not in before)
+    return artists
+
+
+def measure(live:dict, lo:int, hi:int):
+    import numpy
+    s, shape = live["scale"], live["shape"]
+    block = shape._replace(translations=shape.translations[lo:hi], index=shape.index[lo:hi], config=shape.config[lo:hi])
+    idents, coords = coordinates(block, factor=2**live["factor"])
+    groups, counts = numpy.unique(numpy.column_stack((block.index, block.config)), axis=0, return_counts=True)
+    return measured(
+        cells=hi-lo, base1=binary(idents), base2=binary(coords * s[0] / s[1]),
+        groups=collections.Counter(dict(zip(map(tuple, groups.tolist()), counts.tolist()))),
+    )
+
+measured = collections.namedtuple("measured", "cells base1 base2 groups")
+
+
+def merged(*bases):
+    import numpy
+    powers = collections.defaultdict(list)
+    for base in bases:
+        for p, ns in base.items():
+            powers[p].append(ns)
+    return {p: numpy.unique(numpy.concatenate(ns)) for p, ns in powers.items()}
+
+
+def steer(live:dict, n:float|None=None, factor:int|None=None, text:str|None=None):
+    import numpy
+    before = live["scale"], live["factor"]
+    if text is not None:
+        with contextlib.suppress(ValueError, TypeError, ZeroDivisionError):
+            _, _, kwds = flags(None, f"-scale={text}")
+            live["scale"] = configuration(scale=kwds["scale"]).scale if "scale" in kwds else live["scale"]
+    if factor is not None:
+        live["factor"] = int(factor)
+    if (live["scale"], live["factor"]) != before:
+        live["drawn"][:] = ((lo, hi, artists, stage, None) for lo, hi, artists, stage, _ in live["drawn"])
+    if n is not None:
+        live["n"] = math.inf if n >= live["controls"][0].valmax else n
+        live["target"] = int(numpy.searchsorted(live["reach"], live["n"], "right"))
+    zoom(live)
+    live["timer"].start()
+
+
+def zoom(live:dict):
+    import matplotlib.ticker
+    extent, target, loaded, g, width = live["extent"], live["target"], live["loaded"], 2**live["factor"], live["width"]
+    m = (extent[target-1] if target else 1) if loaded >= live["n"] or not len(extent) else (
+        max(extent[-1], extent[-1] * (min(live["n"], live["top"]) + 1) / (loaded + 1)))
+    if live["zoom"] == (m, g):
+        return
+    live["zoom"] = m, g
+    for ax in (ax for i, ax in live["axs"].items() if i.isdigit()):
+        ax.set_xlim(-m, m)
+        ax.set_ylim(-m, m)
+        ax.set_zlim(-m, m)
+        for axis in (ax.xaxis, ax.yaxis, ax.zaxis):
+            if live["axes"] and len(axis.get_ticklocs()):
+                axis.set_major_locator(matplotlib.ticker.MultipleLocator(base=width/g))
+                axis.set_major_formatter(lambda value, xy, g=g: f"${value*g/width:.0f}$")
+
+
+def banner(live:dict):
+    s, f, fig, axs, shape = live["scale"], live["factor"], live["fig"], live["axs"], live["shape"]
+    fresh = [m for *_, m in live["drawn"] if m is not None]
+    e = stability(merged(*(m.base2 for m in fresh)), scale=s, idents=merged(*(m.base1 for m in fresh)))
+    r = reporting(e, s)
+    status = (f"{r['regime']} scale={r['scale']} rescale=2^{f} cells={sum(m.cells for m in fresh)}",
+              *(f"{k}={r[k]}" for k in ("epsilon_delta", "epsilon_N", "epsilon_Delta")))
+    if live["title"]:
+        fig.canvas.manager and fig.canvas.manager.set_window_title("  ".join(status))
+    else:
+        fig.suptitle(x=0.5, y=1, va="top", fontsize=live["fs"]/3, fontfamily="monospace", t="\n".join(status))
+    if live["bars"] or live["title"]:
+        configs = [c._replace(rescale=(c.rescale[0] * 2**max(f, 0), c.rescale[1] * 2**max(-f, 0))) for c in shape.configs]
+        headers, cache = collections.Counter(), live["headers"]
+        for (i, k), count in sum((m.groups for m in fresh), collections.Counter()).items():
+            key = i, k, s, f
+            cache[key] = cache[key] if key in cache else analysis((shape.prototypes[i], configs[k]), scale=s).supheaders
+            for h in cache[key]:
+                headers[h._replace(count=-1)] += count
+        summary = analyzed(cells=None, supheaders=sorted(h._replace(count=c) for h, c in headers.items()), epsilon=e)
+        "B" in axs and axs["B"].cla()
+        annotate(fig, axs, summary, s, live["views"], live["mosaic"], live["figrats"], live["fs"], 96 * s[0] / s[1],
+                 bars=live["bars"], title=live["title"], axes=live["axes"])
+        fig._suptitle and live["title"] and fig._suptitle.set(x=0.5, y=1, ha="center", va="top", fontsize=live["fs"]/2)
+
+
+@contextlib.contextmanager
+def profiling(enable:bool|str=True):
+    outer = profiled.get("report")
+    profiled["report"] = dict() if enable else outer
+    try:
+        yield profiled["report"] if enable else None
+    finally:
+        profiled["report"] = outer
+
+profiled = dict()
+
+
+def timed(name:str):
+    return contextlib.nullcontext() if profiled.get("report") is None else timing(profiled["report"], name)
+
+
+@contextlib.contextmanager
+def timing(report:dict, name:str):
+    row = report.setdefault(name, dict(calls=0, seconds=0.0, peak=0))
+    start = time.perf_counter()
+    try:
+        yield row
+    finally:
+        row["calls"] += 1
+        row["seconds"] += time.perf_counter() - start
+        row["peak"] = max(row["peak"], peak())
+
+
+def tally(name:str, **counts):
+    if profiled.get("report") is not None:
+        row = profiled["report"].setdefault(name, dict(calls=0, seconds=0.0, peak=0))
+        row.update((k, row.get(k, 0) + v) for k, v in counts.items())
+
+
+def peak():
+    try:
+        import resource
+    except ImportError:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def breakdown(report:dict, format:bool|str=True, **labels):
+    labels = {k: v for k, v in labels.items() if v is not None}
+    if format == "json":
+        sys.stderr.write(json.dumps(dict(labels, stages=report)) + "\n")
+        return
+    lines = [" ".join(f"{k}={v}" for k, v in labels.items())]
+    lines.append(f"{'stage':<16}{'calls':>7}{'seconds':>11}{'peak MiB':>11}  counts")
+    lines.extend(
+        f"{name:<16}{row['calls']:>7}{row['seconds']:>11.3f}{row['peak']/2**20:>11.1f}  "
+        + " ".join(f"{k}={v}" for k, v in row.items() if k not in ("calls", "seconds", "peak"))
+        for name, row in report.items()
+    )
+    sys.stderr.write("\n".join(filter(None, lines)) + "\n")
 
 
 def help(*args, **kwds):
@@ -738,23 +2463,24 @@ def help(*args, **kwds):
 
 
 def main(*args, **kwds):
+    if args and args[0].partition(":")[0] in ("batch", "stream", "serve"):
+        _, _, kwds = flags(None, *(f"-{opt}" for opt in args[0].split(":")[1:] if opt), **kwds)
+        tool = args[0].partition(":")[0]
+        profile = kwds.pop("profile", None) if tool == "stream" else None
+        with profiling(profile) as report, timed(tool):
+            status = dict(batch=batch, stream=stream, serve=serve)[tool](*args[1:], **kwds)
+        report is None or breakdown(report, profile)
+        return status
     tool, args, kwds = (
         flags("figure", "-auto", "-pop", **kwds) if not args else
         flags(None, *args, **kwds) if args[0] and args[0][0] in "-:./" else
         flags(*args)
     )
-    toolc, shapec, pop, more = configuration(
-        ("scale", "views", "bars", "title", "axes", "savefig", "bg"),
+    toolc, shapec, pop, profile, cache, scales, chunk, more = configuration(
+        ("scale", "views", "bars", "title", "axes", "savefig", "bg", "format", "workers", "backend", "mesh"),
         ("auto", "rescale", "n"),
-        "pop", **kwds,
+        "pop", "profile", "cache", "scales", "chunk", **kwds,
     )
-    args = args or (*filter(None, (
-        # Largest first.
-        "pyritohedra+" if random.random() < 3/4 else None,
-        "pyritohedra",
-        "tetradecahedra+" if random.random() < 3/4 else None,
-        "tetradecahedra",
-    )),)
     shapers = {
         "pyritohedra": pyritohedra,
         "tetradecahedra": tetradecahedra,
@@ -764,27 +2490,48 @@ def main(*args, **kwds):
         "help": help,
         "figure": figure,
         "interactive": interactive,
+        "stats": stats,
+        "sweep": sweep,
+        "export": export,
     }
-    shapes = list()
-    configs = dict()
-    while args:
-        shape, args, kwds = flags(args[0], *args[1:], **shapec._asdict(), **more._asdict())
-        if shape not in shapers:
-            shape = sorted(
-                (len(os.path.commonprefix((shape, s))), s.startswith(shape) and s or shape) for s in filter(None, shapers))[-1][1]
-        for ident, config in shapers[shape](**kwds):
-            k = shape, config._fields, config
-            c = configs[k] = configs[k] if k in configs else configuration(
-                **dict(dict.fromkeys(("colormap", "edges", "faces", "verts", "centers", "lines")), **config._asdict()))
-            shapes.append((ident, c))
     if tool not in tooling:
         tool = sorted(
             (len(os.path.commonprefix((tool, t))), t.startswith(tool) and t or tool) for t in filter(None, tooling))[-1][1]
-    tooling[tool](*shapes, **toolc._asdict())
+    args = () if tooling[tool] is help else args or (*filter(None, (
+        # Largest first.
+        "pyritohedra+" if random.random() < 3/4 else None,
+        "pyritohedra",
+        "tetradecahedra+" if random.random() < 3/4 else None,
+        "tetradecahedra",
+    )),)
+    blocks = list()
+    calls = list()
+    configs = dict()
+    with profiling(profile) as report:
+        while args:
+            shape, args, kwds = flags(args[0], *args[1:], **shapec._asdict(), **more._asdict())
+            if shape not in shapers:
+                shape = sorted((len(os.path.commonprefix((shape, s))), s.startswith(shape) and s or shape)
+                               for s in filter(None, shapers))[-1][1]
+            if tooling[tool] is interactive:
+                # Nearest-first, band by band, as the view asks for more.
+                calls.append((shape, functools.partial(shapers[shape], batch=True, **kwds), radius(kwds.get("n", 0))))
+                continue
+            with timed(shape):
+                blocks.extend(canonical(shape, shapers[shape](batch=True, **kwds), configs))
+        with timed(tool or "figure"):
+            run = tooling[tool]
+            opts = dict(toolc._asdict(), scales=scales) if run is sweep else toolc._asdict()
+            opts = dict(opts, chunk=chunk) if chunk is not None and run in (sweep, export, interactive) else opts
+            run = functools.partial(cached, run, limit=cache) if run in (figure, stats, sweep) and cache not in (None, 0, False) else run
+            run(*(gather(*blocks),) if blocks else (layered(max(r for *_, r in calls), layers(calls, configs)),) if calls else (),
+                **opts)
+    report is None or breakdown(report, profile, tool=tool or "figure",
+                                savefig=toolc.savefig if tooling[tool] in (figure, export) else None)
     pop and os.spawnvp(os.P_WAIT, pop[0], pop)
 
 
 if __name__ == "__main__":
-    try: status = main(*sys.argv[1:])
+    try: status = forward(*sys.argv[1:]) if os.environ.get("A15_SERVE") else main(*sys.argv[1:])
     except: status = help() or 1
     sys.exit(status)
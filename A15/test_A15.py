@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import collections, functools, itertools, os, tempfile, unittest
+
+import A15
+
+
+def legacy(shape, simplices):
+    import numpy
+    normals = collections.defaultdict(functools.partial(collections.defaultdict, int))
+    for xyz in simplices:
+        curr = shape[xyz[1]] - shape[xyz[2]]
+        for l, r in itertools.combinations([0, 1, 2], 2):
+            last, curr = curr, shape[xyz[l]] - shape[xyz[r]]
+            norm = (numpy.cross(last, curr)/numpy.linalg.norm(numpy.cross(last, curr))).round(4)
+            normals[frozenset([tuple(norm), tuple(-norm)])][(xyz[l], xyz[r], round(sum(curr**2)**0.5, 4))] += 1
+    bounds = [k2 for es in normals.values() for k2 in es if es[k2] == 1]
+    return sorted(tuple(sorted((int(l), int(r)))) for l, r, _ in bounds), sorted({dist for _, _, dist in bounds})
+
+
+class Boundary(unittest.TestCase):
+
+    def prototypes(self):
+        yield "pyritohedron", A15.pyritohedron(h=1/2)
+        yield "dodecahedron", A15.pyritohedron(h=A15.R["G06"])
+        yield "cube", A15.pyritohedron(h=0, cube=True)
+        for planes in "XYZ":
+            cell, _ = next(A15.tetradecahedra(n=0, planes=planes))
+            yield f"tetradecahedron-{planes}", cell
+
+    def test_legacy(self):
+        import scipy.spatial
+        for name, shape in self.prototypes():
+            for scale in (2**-7, 1/96, 1, 3, 2**22):
+                with self.subTest(name=name, scale=scale):
+                    s = shape * scale
+                    hull = scipy.spatial.ConvexHull(s)
+                    edges, dists = A15.boundary(s, hull.simplices)
+                    self.assertEqual((sorted(map(tuple, edges.tolist())), dists.tolist()), legacy(s, hull.simplices))
+
+
+class Encode(unittest.TestCase):
+
+    scales = (1, 96), (1, 1), (3, 7)
+
+    def test_nearest(self):
+        import numpy
+        rng, offsets = numpy.random.default_rng(10), numpy.array(list(itertools.product((-1, 0, 1), repeat=3)))
+        for stix in (False, True):
+            for scale in self.scales:
+                with self.subTest(stix=stix, scale=scale):
+                    unit = 24*scale[0]/scale[1]
+                    points = rng.uniform(-50, 50, (2**12, 3))*unit
+                    residuals = A15.encode(points, scale, stix=stix).residuals/unit
+                    cubes = numpy.floor(points/unit/4).astype(numpy.int64)
+                    sites = (cubes[:, None, None] + offsets[None, :, None])*4 + numpy.array(A15.A)[None, None]
+                    delta = sites.reshape(len(points), -1, 3) - points[:, None]/unit
+                    norm = (lambda d: numpy.abs(d).max(-1)) if stix else (lambda d: (d*d).sum(-1))
+                    numpy.testing.assert_allclose(norm(residuals), norm(delta).min(-1), atol=1e-9)
+
+    def test_decode(self):
+        import numpy
+        rng = numpy.random.default_rng(11)
+        for stix in (False, True):
+            for scale in self.scales:
+                with self.subTest(stix=stix, scale=scale):
+                    points = rng.uniform(-2**10, 2**10, (2**12, 3))
+                    e = A15.encode(points, scale, stix=stix)
+                    numpy.testing.assert_allclose(A15.decode(e.ids, scale) + e.residuals, points, atol=1e-9)
+                    self.assertTrue(numpy.array_equal(A15.encode(A15.decode(e.ids, scale), scale, stix=stix).ids, e.ids))
+
+
+class Neighbors(unittest.TestCase):
+
+    def test_shell(self):
+        import numpy
+        rng, offsets = numpy.random.default_rng(13), numpy.array(list(itertools.product((-1, 0, 1), repeat=3)))
+        cubes = numpy.concatenate((rng.integers(-2**19, 2**19, (500, 3)), [(-2**19,) * 3, (2**19 - 1,) * 3, (-2**19, 0, 2**19 - 1)]))
+        sites = (cubes[:, None] * 4 + numpy.array(A15.A)[None]).reshape(-1, 3)
+        ids = A15.encode(sites, (1, 24)).ids
+        for site, i, row in zip(sites, ids, A15.neighbors(ids)):
+            near = (((site >> 2) + offsets)[:, None] * 4 + numpy.array(A15.A)[None]).reshape(-1, 3)
+            dist = ((near - site)**2).sum(-1)
+            near = near[(dist > 0) & (dist <= 6) & (numpy.abs((near >> 2) + 0.5) < 2**19).all(-1)]
+            with self.subTest(id=int(i)):
+                self.assertEqual(sorted(row[row >= 0].tolist()), sorted(A15.encode(near, (1, 24)).ids.tolist()))
+                if (numpy.abs((site >> 2) + 0.5) < 2**19 - 1).all():
+                    self.assertEqual(len(near), 12 if i & 7 < 2 else 14)
+
+
+class Pack(unittest.TestCase):
+
+    orders = ("xmajor", "morton")
+
+    def setUp(self):
+        import numpy
+        rng = numpy.random.default_rng(12)
+        self.encoded = A15.encode(rng.uniform(-2**12, 2**12, (5000, 3)), (1, 96))
+        self.ids = numpy.sort(self.encoded.ids)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "ids.a15")
+
+    def test_roundtrip(self):
+        import numpy
+        for varint, order, ids in itertools.product((False, True), self.orders, (self.ids, self.ids[::-1], self.ids[:0])):
+            for chunk in (None, 1, 777, 2**20):
+                with self.subTest(varint=varint, order=order, count=len(ids), chunk=chunk):
+                    A15.pack(self.path, ids, (3, 7), stix=True, epsilon=0.25, varint=varint, order=order)
+                    p = A15.unpack(self.path, chunk)
+                    self.assertEqual((p.scale, p.stix, p.epsilon, p.count, p.order), ((3, 7), True, 0.25, len(ids), order))
+                    got = numpy.concatenate((numpy.empty(0, dtype=numpy.int64), *p.ids)) if chunk else p.ids
+                    self.assertTrue(numpy.array_equal(got, ids))
+
+    def test_chunks(self):
+        import numpy
+        for varint, order in itertools.product((False, True), self.orders):
+            with self.subTest(varint=varint, order=order):
+                parts = (A15.encoded(self.encoded.ids[lo:lo+999], self.encoded.residuals[lo:lo+999]) for lo in range(0, 5000, 999))
+                A15.pack(self.path, parts, varint=varint, order=order)
+                p = A15.unpack(self.path)
+                r = numpy.sqrt((self.encoded.residuals**2).sum(-1)).max()
+                self.assertEqual((p.count, p.epsilon), (5000, r))
+                self.assertTrue(numpy.array_equal(p.ids, self.encoded.ids))
+
+
+class Morton(unittest.TestCase):
+
+    def setUp(self):
+        import numpy
+        rng = numpy.random.default_rng(14)
+        self.ids = A15.encode(rng.normal(0, 8, (2**14, 3)), (1, 24)).ids
+
+    def test_roundtrip(self):
+        import numpy
+        ids = numpy.concatenate((self.ids, A15.encode([(-2**21 + 1,) * 3, (2**21 - 4,) * 3], (1, 24)).ids))
+        keys = A15.morton(ids)
+        self.assertTrue(numpy.array_equal(A15.unmorton(keys), ids))
+        self.assertTrue(numpy.array_equal(A15.unmorton(keys.reshape(2, -1)), ids.reshape(2, -1)))
+
+    def test_queries(self):
+        import numpy
+        rng = numpy.random.default_rng(15)
+        for order in ("xmajor", "morton"):
+            keys = numpy.unique(A15.morton(self.ids) if order == "morton" else self.ids)
+            xyz = A15.decode(A15.unmorton(keys) if order == "morton" else keys, (1, 24))
+            for lo, hi in numpy.sort(rng.normal(0, 8, (16, 2, 3)), axis=1):
+                with self.subTest(order=order, lo=lo, hi=hi):
+                    got = A15.box(keys, lo, hi, (1, 24), order)
+                    self.assertEqual(sorted(got.tolist()), numpy.flatnonzero(((xyz >= lo) & (xyz <= hi)).all(-1)).tolist())
+            for center, radius in zip(rng.normal(0, 8, (16, 3)), rng.uniform(0, 8, 16)):
+                with self.subTest(order=order, center=center, radius=radius):
+                    got = A15.sphere(keys, center, radius, (1, 24), order)
+                    self.assertEqual(sorted(got.tolist()), numpy.flatnonzero(((xyz - center)**2).sum(-1) <= radius**2).tolist())
+
+
+class Rational(unittest.TestCase):
+
+    def shapes(self):
+        for rescale in ((1, 1), (2, 1), (1, 3)):
+            for name, fn in (("pyritohedra", A15.pyritohedra), ("tetradecahedra", A15.tetradecahedra)):
+                for stix in (False, True):
+                    blocks = fn(batch=True, n=2, stix=stix, rescale=rescale, auto=False, faces=True)
+                    yield (name, stix, rescale), A15.gather(*A15.canonical(name, blocks, dict()))
+
+    def test_float(self):
+        import numpy
+        for key, shape in self.shapes():
+            for scale in ((1, 1), (1, 64), (3, 128), (5, 2**20)):
+                with self.subTest(shape=key, scale=scale):
+                    exact = A15.rational(shape, scale=scale)
+                    self.assertIsNotNone(exact)
+                    cells = list(A15.expand(shape))
+                    coords = [(i * c.rescale[0] * scale[0] / c.rescale[1] / scale[1]).ravel() for i, c in cells
+                              if c.rescale[1] == 1 and float(c.rescale[0]).is_integer()]
+                    idents = [i.ravel() for i, _ in cells]
+                    e = A15.stability(numpy.concatenate((*coords, ())), scale=scale, idents=numpy.concatenate(idents))
+                    self.assertEqual(exact._replace(base1=None, base2=None), e._replace(base1=None, base2=None))
+                    for got, want in ((exact.base1, e.base1), (exact.base2, e.base2)):
+                        self.assertEqual({p: sorted(map(int, ns)) for p, ns in got.items()},
+                                         {p: sorted(map(int, ns)) for p, ns in want.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()